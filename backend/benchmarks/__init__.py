@@ -0,0 +1,14 @@
+"""Performance benchmarks run against synthetic stand-in models."""
+
+import os
+
+# The backend reads its R2 settings on import; the benchmarks never talk to
+# Cloudflare, so placeholder values are enough
+for _name in (
+    "CLOUDFLARE_ACCOUNT_ID",
+    "CLOUDFLARE_R2_ACCESS_KEY_ID",
+    "CLOUDFLARE_R2_SECRET_ACCESS_KEY",
+    "R2_NAMESPACE",
+):
+    os.environ.setdefault(_name, "benchmark")
+os.environ.setdefault("R2_BUCKET_NAME", "models")
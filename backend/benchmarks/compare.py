@@ -0,0 +1,79 @@
+"""
+Compare two benchmark result files and flag regressions.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.compare baseline.json results.json --threshold 0.1
+
+Exits with status 1 when any metric got worse by more than the threshold.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """Flatten nested results into dotted metric names."""
+    metrics = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            metrics.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[name] = float(value)
+    return metrics
+
+
+def lower_is_better(name: str) -> Optional[bool]:
+    """Direction of a metric from its unit suffix, None if it isn't compared."""
+    if name.endswith(("_ms", "_seconds")):
+        return True
+    if name.endswith("_per_second"):
+        return False
+    return None
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark runs.")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Relative change counted as a regression (default: 0.1 = 10%%)",
+    )
+    args = parser.parse_args(argv)
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+    baseline.pop("environment", None)
+    candidate.pop("environment", None)
+    before, after = flatten(baseline), flatten(candidate)
+
+    regressions = 0
+    for name in sorted(before.keys() & after.keys()):
+        direction = lower_is_better(name)
+        if direction is None or before[name] == 0:
+            continue
+
+        change = (after[name] - before[name]) / before[name]
+        worse = change > args.threshold if direction else change < -args.threshold
+        better = change < -args.threshold if direction else change > args.threshold
+        if worse or better:
+            label = "REGRESSION" if worse else "improvement"
+            print(
+                f"{label:<11} {name}: {before[name]:.4g} -> {after[name]:.4g} "
+                f"({change:+.1%})"
+            )
+        regressions += worse
+
+    print(f"{regressions} regression(s) over {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Minimal S3-compatible object server for benchmarking downloads locally.
+
+It implements just what ``R2Client`` uses to fetch models, HEAD and ranged
+GET with ``If-Match`` and the objects' metadata, over plain HTTP on localhost, so downloads go through
+the real boto3 client and the parallel ranged download code.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import unquote
+
+import boto3
+from botocore.config import Config
+
+from cloudflare.client import CHECKSUM_METADATA_KEY, R2Client
+
+RANGE_PATTERN = re.compile(r"bytes=(\d+)-(\d*)")
+
+
+class LocalS3Server:
+    """Serve in-memory objects under /<bucket>/<key> on a background thread."""
+
+    def __init__(self, latency: float = 0.0):
+        # Simulated round trip time added to every request, in seconds
+        self.latency = latency
+        self.objects: Dict[str, Tuple[bytes, str, Dict[str, str]]] = {}
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def put(self, key: str, body: bytes) -> str:
+        """Store an object, with metadata like upload_model's, and return its ETag."""
+        etag = hashlib.md5(body).hexdigest()
+        metadata = {CHECKSUM_METADATA_KEY: hashlib.sha256(body).hexdigest()}
+        self.objects[key] = (body, etag, metadata)
+        return etag
+
+    def start(self) -> "LocalS3Server":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def client(self) -> R2Client:
+        """An R2 client that talks to this server instead of Cloudflare."""
+        return local_r2_client(self.endpoint_url)
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_HEAD(self) -> None:
+                self._respond(send_body=False)
+
+            def do_GET(self) -> None:
+                self._respond(send_body=True)
+
+            def _respond(self, send_body: bool) -> None:
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                # Path-style addressing: /<bucket>/<key>
+                key = unquote(self.path.split("?")[0]).split("/", 2)[-1]
+                if key not in server.objects:
+                    self._send_empty(404)
+                    return
+
+                body, etag, metadata = server.objects[key]
+                if_match = self.headers.get("If-Match")
+                if if_match and if_match.strip('"') != etag:
+                    self._send_empty(412)
+                    return
+
+                start, end, status = 0, len(body) - 1, 200
+                match = RANGE_PATTERN.fullmatch(self.headers.get("Range", ""))
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2) or end), end)
+                    status = 206
+
+                self.send_response(status)
+                self.send_header("ETag", f'"{etag}"')
+                self.send_header("Accept-Ranges", "bytes")
+                for name, value in metadata.items():
+                    self.send_header(f"x-amz-meta-{name}", value)
+                self.send_header("Content-Length", str(end - start + 1))
+                if status == 206:
+                    self.send_header(
+                        "Content-Range", f"bytes {start}-{end}/{len(body)}"
+                    )
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body[start : end + 1])
+
+            def _send_empty(self, status: int) -> None:
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format: str, *args) -> None:
+                pass
+
+        return Handler
+
+
+def local_r2_client(endpoint_url: str) -> R2Client:
+    """An R2 client for a local server, possibly running in another process."""
+    r2_client = R2Client()
+    r2_client._s3_resource = boto3.resource(
+        "s3",
+        endpoint_url=endpoint_url,
+        aws_access_key_id="benchmark",
+        aws_secret_access_key="benchmark",
+        region_name="auto",
+        config=Config(s3={"addressing_style": "path"}),
+    )
+    return r2_client
@@ -0,0 +1,394 @@
+"""
+Run the benchmark suite and write the results as JSON.
+
+Usage, from the backend directory:
+
+    python -m benchmarks.run --output results.json
+
+Stand-in models are served from a local S3-compatible server, so the suite
+needs no credentials or network. The service runs with the inference
+settings from the environment, which are recorded with the results. Latencies
+are reported in milliseconds (``*_ms``), durations in seconds (``*_seconds``)
+and throughputs per second (``*_per_second``), which is what
+``benchmarks.compare`` relies on.
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from .local_s3 import LocalS3Server, local_r2_client
+from .standins import build_standins
+
+MODEL_NAMES = ["logistic_regressor", "discrete_bayesian_network", "gmm"]
+
+# Run in a bare interpreter, as the benchmark process has NumPy and boto3
+# loaded already
+IMPORT_PROBE = """
+import json, time
+started = time.perf_counter()
+import main
+print(json.dumps({"import_main_seconds": time.perf_counter() - started}))
+"""
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency percentiles, in milliseconds, of samples taken in seconds."""
+    values = np.asarray(samples) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p90_ms": float(np.percentile(values, 90)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max()),
+    }
+
+
+def random_inputs(count: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Random valid /predict request bodies."""
+    from inference.models import ISAPRE_VALUES, TIPO_VALUES
+
+    rng = random.Random(seed)
+    return [
+        {
+            "isapre": rng.choice(ISAPRE_VALUES),
+            "tipo": rng.choice(TIPO_VALUES),
+            "total": rng.randint(1_000, 3_000_000),
+        }
+        for _ in range(count)
+    ]
+
+
+def use_local_storage(endpoint_url: str, cache_dir: str) -> None:
+    """Point the global model cache at a local server and cache directory."""
+    from inference.cache import model_cache
+
+    model_cache.cache_dir = Path(cache_dir)
+    model_cache._r2_client = local_r2_client(endpoint_url)
+
+
+def in_fresh_process(function: Callable, *args: Any) -> Any:
+    """Run a function in a newly spawned interpreter, so nothing is imported yet."""
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(function, args)
+
+
+def cold_start_import() -> Dict[str, float]:
+    """Time importing the app, which every cold start pays before serving."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def cold_start_stages(endpoint_url: str) -> Dict[str, Dict[str, float]]:
+    """Time download, unpickle, adapter creation and first prediction per model."""
+    from inference.adapters import ModelAdapterFactory
+    from inference.cache import ModelCache
+    from inference.service import InferenceService
+
+    r2_client = local_r2_client(endpoint_url)
+    results = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for model_name in MODEL_NAMES:
+            path = Path(cache_dir) / f"{model_name}.pkl"
+
+            started = time.perf_counter()
+            asyncio.run(r2_client.download_to_file(model_name, path))
+            downloaded = time.perf_counter()
+            model = ModelCache._load_file(path, "pickle")
+            unpickled = time.perf_counter()
+            adapter = ModelAdapterFactory.create_adapter(model_name, model)
+            adapted = time.perf_counter()
+            adapter.score_batch([InferenceService.WARMUP_INPUT])
+            predicted = time.perf_counter()
+
+            results[model_name] = {
+                "size_bytes": path.stat().st_size,
+                "download_seconds": downloaded - started,
+                "unpickle_seconds": unpickled - downloaded,
+                "adapter_seconds": adapted - unpickled,
+                "first_prediction_seconds": predicted - adapted,
+            }
+    return results
+
+
+def cold_start_service(endpoint_url: str) -> Dict[str, float]:
+    """Time the service from an empty cache to ready, then its first prediction."""
+    from inference.schemas import InferenceInput
+    from inference.service import inference_service
+
+    async def run() -> Dict[str, float]:
+        started = time.perf_counter()
+        await inference_service.warmup()
+        warmed = time.perf_counter()
+        await inference_service.predict_all_models(
+            InferenceInput.model_validate(random_inputs(1, seed=1)[0])
+        )
+        predicted = time.perf_counter()
+        inference_service.shutdown()
+        return {
+            "warmup_seconds": warmed - started,
+            "first_predict_seconds": predicted - warmed,
+        }
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        use_local_storage(endpoint_url, cache_dir)
+        return asyncio.run(run())
+
+
+async def model_latency(iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Single-row latency of each adapter, direct and through the executor."""
+    from inference.schemas import InferenceInput
+    from inference.service import inference_service
+
+    inputs = [InferenceInput.model_validate(i) for i in random_inputs(iterations)]
+    results = {}
+    for model_name in MODEL_NAMES:
+        adapter = await inference_service._get_adapter(model_name)
+
+        direct = []
+        for input_data in inputs:
+            started = time.perf_counter()
+            adapter.score_batch([input_data])
+            direct.append(time.perf_counter() - started)
+
+        executor = []
+        for input_data in inputs:
+            started = time.perf_counter()
+            await adapter.predict(input_data)
+            executor.append(time.perf_counter() - started)
+
+        results[model_name] = {
+            "direct": summarize(direct),
+            "executor": summarize(executor),
+        }
+    return results
+
+
+async def predict_latency(
+    client: httpx.AsyncClient, iterations: int
+) -> Dict[str, Dict[str, float]]:
+    """Sequential /predict latency with distinct inputs and one repeated input."""
+
+    async def timed(bodies: List[Dict[str, Any]]) -> List[float]:
+        samples = []
+        for body in bodies:
+            started = time.perf_counter()
+            response = await client.post("/predict", json=body)
+            samples.append(time.perf_counter() - started)
+            response.raise_for_status()
+        return samples
+
+    distinct = random_inputs(iterations, seed=2)
+    repeated = distinct[:1] * iterations
+    return {
+        "distinct_inputs": summarize(await timed(distinct)),
+        "repeated_input": summarize(await timed(repeated)),
+    }
+
+
+async def batch_throughput(batch_sizes: List[int]) -> Dict[str, Any]:
+    """Rows per second of predict_batch and of each adapter's array path."""
+    from inference.schemas import InferenceInput
+    from inference.service import inference_service
+
+    service = {}
+    for batch_size in batch_sizes:
+        inputs = [
+            InferenceInput.model_validate(i) for i in random_inputs(batch_size, seed=3)
+        ]
+        repeats = max(1, 10_000 // batch_size)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            await inference_service.predict_batch(inputs)
+        elapsed = time.perf_counter() - started
+        service[str(batch_size)] = {
+            "batch_seconds": elapsed / repeats,
+            "rows_per_second": batch_size * repeats / elapsed,
+        }
+
+    rows = max(batch_sizes)
+    rng = np.random.default_rng(3)
+    arrays = (
+        rng.integers(0, 9, rows),
+        rng.integers(0, 12, rows),
+        rng.integers(1_000, 3_000_000, rows).astype(np.float64),
+    )
+    adapters = {}
+    for model_name in MODEL_NAMES:
+        adapter = await inference_service._get_adapter(model_name)
+        started = time.perf_counter()
+        adapter.score_arrays(*arrays)
+        adapters[model_name] = {
+            "rows_per_second": rows / (time.perf_counter() - started)
+        }
+
+    return {"predict_batch": service, "score_arrays": adapters}
+
+
+async def concurrent_load(
+    client: httpx.AsyncClient, concurrency_levels: List[int], duration: float
+) -> Dict[str, Dict[str, Any]]:
+    """Throughput and latency of /predict under concurrent clients."""
+    bodies = random_inputs(10_000, seed=4)
+    results = {}
+    for concurrency in concurrency_levels:
+        samples: List[float] = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def worker(offset: int) -> None:
+            nonlocal errors
+            index = offset
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/predict", json=bodies[index % len(bodies)]
+                )
+                samples.append(time.perf_counter() - started)
+                errors += response.status_code != 200
+                index += concurrency
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(offset) for offset in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        results[str(concurrency)] = {
+            "requests": len(samples),
+            "errors": errors,
+            "requests_per_second": len(samples) / elapsed,
+            "latency": summarize(samples),
+        }
+    return results
+
+
+async def serving_benchmarks(args: argparse.Namespace) -> Dict[str, Any]:
+    """Benchmarks run against the app, once its models are warm."""
+    import main
+    from inference.service import inference_service
+
+    results: Dict[str, Any] = {}
+    async with main.app.router.lifespan_context(main.app):
+        await inference_service.warmup()
+
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://benchmark"
+        ) as client:
+            print("Measuring per-model latency")
+            results["model_latency"] = await model_latency(args.iterations)
+            print("Measuring /predict latency")
+            results["predict_latency"] = await predict_latency(client, args.iterations)
+            print("Measuring batch throughput")
+            results["batch_throughput"] = await batch_throughput(args.batch_sizes)
+            print("Measuring concurrent load")
+            results["concurrent_load"] = await concurrent_load(
+                client, args.concurrency, args.duration
+            )
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Where and on what the benchmarks ran."""
+    import fastapi
+    import pandas
+    import sklearn
+
+    from inference.config import settings
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "packages": {
+            "numpy": np.__version__,
+            "pandas": pandas.__version__,
+            "scikit-learn": sklearn.__version__,
+            "fastapi": fastapi.__version__,
+        },
+        "settings": settings.model_dump(),
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the performance benchmarks.")
+    parser.add_argument("--output", type=Path, default=Path("benchmark-results.json"))
+    parser.add_argument(
+        "--iterations", type=int, default=500, help="Samples per latency benchmark"
+    )
+    parser.add_argument(
+        "--batch-sizes", type=_int_list, default=[1, 100, 1_000, 10_000]
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=_int_list,
+        default=[1, 8, 32],
+        help="Concurrent clients for the load benchmark",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=5.0, help="Seconds per concurrency level"
+    )
+    parser.add_argument(
+        "--storage-latency",
+        type=float,
+        default=0.0,
+        help="Simulated round trip to the object store, in seconds",
+    )
+    args = parser.parse_args(argv)
+
+    server = LocalS3Server(latency=args.storage_latency).start()
+    for model_name, body in build_standins().items():
+        server.put(f"{model_name}.pkl", body)
+
+    results: Dict[str, Any] = {"environment": environment()}
+    try:
+        print("Measuring cold start")
+        results["cold_start"] = {
+            "import": cold_start_import(),
+            "stages": in_fresh_process(cold_start_stages, server.endpoint_url),
+            "service": in_fresh_process(cold_start_service, server.endpoint_url),
+        }
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            use_local_storage(server.endpoint_url, cache_dir)
+            results.update(asyncio.run(serving_benchmarks(args)))
+    finally:
+        server.stop()
+
+    args.output.write_text(json.dumps(results, indent=2))
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
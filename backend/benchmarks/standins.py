@@ -0,0 +1,104 @@
+"""
+Synthetic stand-ins for the models stored in R2.
+
+Each stand-in has the same interface as the real model the adapters load:
+a fitted scikit-learn pipeline, an object with ``predict_all``, and a
+callable scoring one ``pd.Series`` row. They are trained on random data, so
+their outputs are meaningless, but their scoring cost and shape are close
+enough to benchmark the serving path.
+"""
+
+import pickle
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.mixture import GaussianMixture
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from inference.models import ISAPRE_VALUES, TIPO_VALUES
+
+
+def make_claims(n: int = 5_000, seed: int = 0) -> Tuple[pd.DataFrame, np.ndarray]:
+    """Random claims and reimbursement outcomes."""
+    rng = np.random.default_rng(seed)
+    claims = pd.DataFrame(
+        {
+            "isapre": rng.choice(ISAPRE_VALUES, n),
+            "tipo": rng.choice(TIPO_VALUES, n),
+            "total": rng.lognormal(11, 1, n).astype(int) + 1,
+        }
+    )
+    approved = rng.random(n) < 1 / (1 + np.exp(11 - np.log(claims["total"])))
+    return claims, approved.astype(int)
+
+
+def make_logistic_regressor(seed: int = 0) -> Pipeline:
+    """Logistic regression pipeline over one-hot categories and a scaled total."""
+    claims, approved = make_claims(seed=seed)
+    preprocessor = ColumnTransformer(
+        [
+            ("categories", OneHotEncoder(handle_unknown="ignore"), ["isapre", "tipo"]),
+            ("total", StandardScaler(), ["total"]),
+        ]
+    )
+    pipeline = Pipeline(
+        [("preprocessor", preprocessor), ("classifier", LogisticRegression())]
+    )
+    return pipeline.fit(claims, approved)
+
+
+class StandInBayesianNetwork:
+    """Discretized network answering ``predict_all`` from conditional tables."""
+
+    def __init__(self, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.bins = [0, 20_000, 50_000, 100_000, 250_000, 1_000_000, np.inf]
+        shape = (len(ISAPRE_VALUES), len(TIPO_VALUES), len(self.bins) - 1)
+        self.probability = rng.random(shape)
+        self.expected_amount = rng.random(shape) * 100_000
+        self.expected_days = rng.random(shape) * 30
+
+    def predict_all(self, isapre: str, tipo: str, total: float):
+        total_bin = pd.cut([total], self.bins).codes[0]
+        index = (ISAPRE_VALUES.index(isapre), TIPO_VALUES.index(tipo), total_bin)
+        return (
+            self.probability[index],
+            self.expected_amount[index],
+            self.expected_days[index],
+        )
+
+
+class StandInRowProba:
+    """Class-conditional Gaussian mixtures over ``total_log`` with category priors."""
+
+    def __init__(self, seed: int = 0):
+        claims, approved = make_claims(seed=seed)
+        total_log = np.log1p(claims[["total"]].to_numpy())
+        self.gmm_approved = GaussianMixture(3, random_state=seed).fit(
+            total_log[approved == 1]
+        )
+        self.gmm_denied = GaussianMixture(3, random_state=seed).fit(
+            total_log[approved == 0]
+        )
+        rates = claims.assign(approved=approved).groupby(["isapre", "tipo"])
+        self.prior = rates["approved"].mean().clip(0.05, 0.95).to_dict()
+
+    def __call__(self, row: pd.Series) -> float:
+        x = np.array([[row["total_log"]]])
+        prior = self.prior.get((row["isapre"], row["tipo"]), 0.5)
+        approved = self.gmm_approved.score_samples(x)[0] + np.log(prior)
+        denied = self.gmm_denied.score_samples(x)[0] + np.log(1 - prior)
+        return float(1 / (1 + np.exp(denied - approved)))
+
+
+def build_standins(seed: int = 0) -> Dict[str, bytes]:
+    """Pickle a stand-in for every model, keyed by its R2 name."""
+    return {
+        "logistic_regressor": pickle.dumps(make_logistic_regressor(seed)),
+        "discrete_bayesian_network": pickle.dumps(StandInBayesianNetwork(seed)),
+        "gmm": pickle.dumps(StandInRowProba(seed)),
+    }
@@ -1,10 +1,18 @@
+import argparse
 import asyncio
+import hashlib
+import os
+import tempfile
 import uuid
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
 from fastapi import HTTPException
 
-from .config import settings
+from .config import get_settings
+
+# Object metadata holding the SHA-256 of the content, set by upload_model
+CHECKSUM_METADATA_KEY = "sha256"
 
 
 class R2Client:
@@ -18,6 +26,12 @@ class R2Client:
     def _get_s3_resource(self):
         """Get or create S3 resource for R2."""
         if self._s3_resource is None:
+            # boto3 takes a noticeable part of startup to import, so only
+            # import it once R2 is actually used
+            import boto3
+            from botocore.exceptions import NoCredentialsError
+
+            settings = get_settings()
             try:
                 self._s3_resource = boto3.resource(
                     "s3",
@@ -35,7 +49,7 @@ class R2Client:
         """Get or create bucket object."""
         if self._bucket is None:
             s3 = self._get_s3_resource()
-            self._bucket = s3.Bucket(settings.R2_BUCKET_NAME)  # type: ignore
+            self._bucket = s3.Bucket(get_settings().R2_BUCKET_NAME)  # type: ignore
         return self._bucket
 
     async def upload_file(
@@ -67,7 +81,59 @@ class R2Client:
 
             return file_uuid
 
-        except ClientError as e:
+        except _client_error() as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to upload file to R2: {str(e)}"
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Unexpected error during upload: {str(e)}"
+            )
+
+    async def upload_model(
+        self, name: str, source: Path, extension: str = ".pkl"
+    ) -> Optional[str]:
+        """
+        Upload a model file to R2 along with the SHA-256 of its content.
+
+        Large files go up in parts, whose ETag isn't a checksum of the content,
+        so downloads verify the digest stored in the object metadata instead.
+
+        Args:
+            name: The name of the file
+            source: The file to upload
+            extension: The extension of the file in R2
+
+        Returns:
+            str | None: The ETag of the uploaded version
+
+        Raises:
+            HTTPException: If upload fails
+        """
+        try:
+            object_key = f"{name}{extension}"
+            client = self._get_s3_resource().meta.client
+            settings = get_settings()
+
+            def _upload():
+                sha256 = hashlib.sha256()
+                with open(source, "rb") as f:
+                    while chunk := f.read(1024 * 1024):
+                        sha256.update(chunk)
+                client.upload_file(
+                    str(source),
+                    settings.R2_BUCKET_NAME,
+                    object_key,
+                    ExtraArgs={"Metadata": {CHECKSUM_METADATA_KEY: sha256.hexdigest()}},
+                )
+                head = client.head_object(
+                    Bucket=settings.R2_BUCKET_NAME, Key=object_key
+                )
+                return _clean_etag(head.get("ETag"))
+
+            return await asyncio.get_event_loop().run_in_executor(None, _upload)
+
+        except _client_error() as e:
             raise HTTPException(
                 status_code=500, detail=f"Failed to upload file to R2: {str(e)}"
             )
@@ -76,34 +142,91 @@ class R2Client:
                 status_code=500, detail=f"Unexpected error during upload: {str(e)}"
             )
 
-    async def download_file(self, name: str) -> bytes:
+    async def download_to_file(
+        self, name: str, destination: Path, extension: str = ".pkl"
+    ) -> Optional[str]:
         """
-        Download a file from R2 by name.
+        Download a file from R2 straight to disk with parallel range requests.
+
+        Parts are streamed into a temporary file next to ``destination``, which
+        is renamed into place only after its size and checksum are verified,
+        so a failed download never leaves a truncated file behind.
 
         Args:
-            file_uuid: The UUID4 of the file
+            name: The name of the file
+            destination: Where to write the file
+            extension: The extension of the file in R2
 
         Returns:
-            bytes: The file content
+            str | None: The ETag of the downloaded version
 
         Raises:
             HTTPException: If file doesn't exist or download fails
         """
         try:
-            object_key = f"{name}.pkl"
-            bucket = self._get_bucket()
+            object_key = f"{name}{extension}"
+            client = self._get_s3_resource().meta.client
+            settings = get_settings()
 
             def _download():
-                obj = bucket.Object(object_key)
-                return obj.get()["Body"].read()
+                head = client.head_object(
+                    Bucket=settings.R2_BUCKET_NAME, Key=object_key
+                )
+                size = head["ContentLength"]
+                etag = _clean_etag(head.get("ETag"))
+                sha256 = head.get("Metadata", {}).get(CHECKSUM_METADATA_KEY)
 
-            file_content = await asyncio.get_event_loop().run_in_executor(
-                None, _download
-            )
-            return file_content
+                fd, temp_path = tempfile.mkstemp(
+                    dir=destination.parent,
+                    prefix=f".{destination.name}.",
+                    suffix=".part",
+                )
+                try:
+                    os.ftruncate(fd, size)
+
+                    def _download_part(start: int) -> int:
+                        end = min(start + settings.R2_DOWNLOAD_PART_SIZE, size) - 1
+                        request = {"Range": f"bytes={start}-{end}"}
+                        if etag:
+                            # Fail instead of mixing parts of two versions
+                            request["IfMatch"] = f'"{etag}"'
+                        response = client.get_object(
+                            Bucket=settings.R2_BUCKET_NAME, Key=object_key, **request
+                        )
+                        offset = start
+                        for chunk in response["Body"].iter_chunks(1024 * 1024):
+                            os.pwrite(fd, chunk, offset)
+                            offset += len(chunk)
+                        return offset - start
+
+                    with ThreadPoolExecutor(
+                        max_workers=settings.R2_DOWNLOAD_CONCURRENCY
+                    ) as pool:
+                        written = sum(
+                            pool.map(
+                                _download_part,
+                                range(0, size, settings.R2_DOWNLOAD_PART_SIZE),
+                            )
+                        )
 
-        except ClientError as e:
-            if e.response["Error"]["Code"] == "NoSuchKey":
+                    if written != size:
+                        raise ValueError(f"expected {size} bytes, got {written}")
+                    _verify_checksum(fd, etag, sha256)
+
+                    os.fsync(fd)
+                    os.close(fd)
+                    fd = -1
+                    os.replace(temp_path, destination)
+                    return etag
+                finally:
+                    if fd >= 0:
+                        os.close(fd)
+                    Path(temp_path).unlink(missing_ok=True)
+
+            return await asyncio.get_event_loop().run_in_executor(None, _download)
+
+        except _client_error() as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
                 raise HTTPException(
                     status_code=404,
                     detail=f"File with name {name} not found in R2",
@@ -117,6 +240,43 @@ class R2Client:
                 status_code=500, detail=f"Unexpected error during download: {str(e)}"
             )
 
+    async def get_file_version(
+        self, name: str, extension: str = ".pkl"
+    ) -> Optional[str]:
+        """
+        Get the current version (ETag) of a file in R2.
+
+        Args:
+            name: The name of the file
+            extension: The extension of the file in R2
+
+        Returns:
+            str | None: The ETag, or None if the file doesn't exist
+
+        Raises:
+            HTTPException: If the lookup fails
+        """
+        try:
+            object_key = f"{name}{extension}"
+            bucket = self._get_bucket()
+
+            def _head():
+                try:
+                    obj = bucket.Object(object_key)
+                    obj.load()
+                    return _clean_etag(obj.e_tag)
+                except _client_error() as e:
+                    if e.response["Error"]["Code"] in ("404", "NoSuchKey"):
+                        return None
+                    raise
+
+            return await asyncio.get_event_loop().run_in_executor(None, _head)
+
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Failed to get file version from R2: {str(e)}"
+            )
+
     async def file_exists(self, name: str) -> bool:
         """
         Check if a file exists in R2.
@@ -135,7 +295,7 @@ class R2Client:
                 try:
                     bucket.Object(object_key).head()
                     return True
-                except ClientError as e:
+                except _client_error() as e:
                     if e.response["Error"]["Code"] == "404":
                         return False
                     raise
@@ -144,3 +304,57 @@ class R2Client:
 
         except Exception:
             return False
+
+
+def _client_error() -> type:
+    """botocore's ClientError, imported along with boto3 on first use."""
+    from botocore.exceptions import ClientError
+
+    return ClientError
+
+
+def _clean_etag(etag: Optional[str]) -> Optional[str]:
+    """Strip the quotes S3-compatible APIs put around ETags."""
+    return etag.strip('"') if etag else None
+
+
+def _verify_checksum(fd: int, etag: Optional[str], sha256: Optional[str]) -> None:
+    """
+    Check a downloaded file against its checksum.
+
+    Files uploaded with upload_model carry the SHA-256 of their content in
+    their metadata. Otherwise single-part uploads have the MD5 of the content
+    as ETag; multipart ETags ("<md5>-<parts>") depend on the upload's part size
+    and can't be checked.
+    """
+    if sha256:
+        digest, expected = hashlib.sha256(), sha256
+    elif etag and "-" not in etag and len(etag) == 32:
+        digest, expected = hashlib.md5(), etag
+    else:
+        return
+
+    offset = 0
+    while chunk := os.pread(fd, 1024 * 1024, offset):
+        digest.update(chunk)
+        offset += len(chunk)
+    if digest.hexdigest() != expected:
+        raise ValueError("checksum mismatch")
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Upload a model file to R2 with its checksum."
+    )
+    parser.add_argument("name", help="Model name in R2")
+    parser.add_argument("source", type=Path, help="Model file (.pkl or .artifact)")
+    args = parser.parse_args(argv)
+
+    etag = asyncio.run(
+        R2Client().upload_model(args.name, args.source, args.source.suffix)
+    )
+    print(f"Uploaded {args.name}{args.source.suffix} (ETag {etag})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -12,10 +14,17 @@ class Settings(BaseSettings):
     R2_BUCKET_NAME: str
     R2_NAMESPACE: str
 
+    # Parallel ranged downloads of large files
+    R2_DOWNLOAD_PART_SIZE: int = 8 * 1024 * 1024
+    R2_DOWNLOAD_CONCURRENCY: int = 8
+
     @property
     def R2_ENDPOINT_URL(self) -> str:
         """Generate the R2 endpoint URL."""
         return f"https://{self.CLOUDFLARE_ACCOUNT_ID}.r2.cloudflarestorage.com"
 
 
-settings = Settings()  # type: ignore
+@lru_cache
+def get_settings() -> Settings:
+    """Load and validate the settings on first use rather than at import."""
+    return Settings()  # type: ignore
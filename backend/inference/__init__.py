@@ -8,6 +8,8 @@ This module provides:
 - FastAPI dependencies
 """
 
+# Imported first so its timer starts before the rest of the package loads
+from .startup import startup_timer
 from .service import inference_service
 from .schemas import (
     InferenceInput,
@@ -20,10 +22,15 @@ from .schemas import (
     GMMResponse,
     IsapreEnum,
     TipoEnum,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    CurveResponse,
+    MatrixResponse,
 )
 from .dependencies import InferenceServiceDep, R2ClientDep
 
 __all__ = [
+    "startup_timer",
     "inference_service",
     "InferenceInput",
     "ModelPrediction",
@@ -35,6 +42,10 @@ __all__ = [
     "GMMResponse",
     "IsapreEnum",
     "TipoEnum",
+    "BatchPredictionRequest",
+    "BatchPredictionResponse",
+    "CurveResponse",
+    "MatrixResponse",
     "InferenceServiceDep",
     "R2ClientDep",
 ]
@@ -1,8 +1,19 @@
 import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple
 
+from .executor import inference_executor
+from .profiling import phase
+from .models import (
+    CompiledBayesianNetwork,
+    GMMScorer,
+    LogisticScorer,
+    ISAPRE_INDEX,
+    ISAPRE_VALUES,
+    TIPO_INDEX,
+    TIPO_VALUES,
+)
 from .schemas import (
     InferenceInput,
     ModelPrediction,
@@ -14,72 +25,228 @@ from .schemas import (
 class ModelAdapter(ABC):
     """Abstract base class for model adapters."""
 
+    model_name: str
+
     def __init__(self, model: Any):
         self.model = model
+        # R2 version of the model and its fingerprint for cache keys and
+        # ETags, set by the service once the adapter is built
+        self.version: Optional[str] = None
+        self.fingerprint: Optional[str] = None
 
-    @abstractmethod
     async def predict(self, input_data: InferenceInput) -> Any:
         """Make a prediction using the model."""
+        predictions = await self.predict_batch([input_data])
+        return predictions[0]
+
+    async def predict_batch(self, inputs: List[InferenceInput]) -> List[Any]:
+        """Make predictions for many inputs on the inference executor."""
+        return await inference_executor.score_batch(self, inputs)
+
+    def score_batch(self, inputs: List[InferenceInput]) -> List[Any]:
+        """Run the model synchronously, returning predictions in input order."""
+        with phase("adapter_preparation", self.model_name):
+            arrays = self._prepare_arrays(inputs)
+        columns = self.score_arrays(*arrays)
+        with phase("response_building", self.model_name):
+            return self._build_predictions(columns)
+
+    @abstractmethod
+    def _build_predictions(self, columns: Dict[str, np.ndarray]) -> List[Any]:
+        """Turn the output arrays of score_arrays into prediction objects."""
         pass
 
-    def _prepare_dataframe(self, input_data: InferenceInput) -> pd.DataFrame:
+    @abstractmethod
+    def score_arrays(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Score rows given as category indices and totals, one array per output."""
+        pass
+
+    def _prepare_arrays(
+        self, inputs: List[InferenceInput]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Convert input data to category indices and totals."""
+        return (
+            np.array([ISAPRE_INDEX[i.isapre.value] for i in inputs], dtype=int),
+            np.array([TIPO_INDEX[i.tipo.value] for i in inputs], dtype=int),
+            np.array([i.total for i in inputs], dtype=np.float64),
+        )
+
+    def _prepare_dataframe(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> pd.DataFrame:
         """Convert input data to DataFrame format."""
         return pd.DataFrame(
-            [
-                {
-                    "isapre": input_data.isapre.value,
-                    "tipo": input_data.tipo.value,
-                    "total": input_data.total,
-                }
-            ]
+            {
+                "isapre": np.asarray(ISAPRE_VALUES, dtype=object)[isapre_idx],
+                "tipo": np.asarray(TIPO_VALUES, dtype=object)[tipo_idx],
+                "total": totals,
+            }
         )
 
 
 class LogisticRegressorAdapter(ModelAdapter):
     """Adapter for logistic regression models."""
 
-    async def predict(self, input_data: InferenceInput) -> ModelPrediction:
-        df = self._prepare_dataframe(input_data)
+    model_name = "logistic_regressor"
+
+    def __init__(self, model: Any):
+        super().__init__(model)
+        # Skip the sklearn pipeline when it can be compiled to NumPy; model
+        # artifacts are already compiled
+        if isinstance(model, LogisticScorer):
+            self.scorer = model
+        else:
+            self.scorer = LogisticScorer.from_pipeline(model)
+
+    def _build_predictions(
+        self, columns: Dict[str, np.ndarray]
+    ) -> List[ModelPrediction]:
+        return [
+            ModelPrediction(probability=float(probability), predicted_class=int(cls))
+            for probability, cls in zip(
+                columns["probability"], columns["predicted_class"]
+            )
+        ]
+
+    def score_arrays(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        with phase("model_call", self.model_name):
+            if self.scorer is not None:
+                probabilities, predicted_classes = self.scorer.score(
+                    isapre_idx, tipo_idx, totals
+                )
+            else:
+                with phase("adapter_preparation", self.model_name):
+                    df = self._prepare_dataframe(isapre_idx, tipo_idx, totals)
 
-        # Get probability and prediction
-        probability = float(self.model.predict_proba(df)[0, 1])
-        predicted_class = int(self.model.predict(df)[0])
+                # Run the pipeline once and take the class from the same
+                # probability
+                probas = self.model.predict_proba(df)
+                probabilities = probas[:, 1]
+                predicted_classes = self.model.classes_[np.argmax(probas, axis=1)]
 
-        return ModelPrediction(probability=probability, predicted_class=predicted_class)
+        return {"probability": probabilities, "predicted_class": predicted_classes}
 
 
 class BayesianNetworkAdapter(ModelAdapter):
     """Adapter for Bayesian Network models."""
 
-    async def predict(self, input_data: InferenceInput) -> BayesianNetworkPrediction:
-        # Bayesian networks have a different interface
-        probability, expected_amount, expected_days = self.model.predict_all(
-            input_data.isapre.value, input_data.tipo.value, input_data.total
-        )
+    model_name = "discrete_bayesian_network"
 
-        return BayesianNetworkPrediction(
-            probability=float(probability),
-            expected_amount=float(expected_amount),
-            expected_days=float(expected_days),
-        )
+    def __init__(self, model: Any):
+        super().__init__(model)
+        # Answer requests by array indexing when the network can be compiled;
+        # artifacts only hold tables covering every total
+        if isinstance(model, CompiledBayesianNetwork):
+            self.tables = model
+        else:
+            self.tables = CompiledBayesianNetwork.compile(model)
+
+    def _build_predictions(
+        self, columns: Dict[str, np.ndarray]
+    ) -> List[BayesianNetworkPrediction]:
+        return [
+            BayesianNetworkPrediction(
+                probability=float(probability),
+                expected_amount=float(expected_amount),
+                expected_days=float(expected_days),
+            )
+            for probability, expected_amount, expected_days in zip(
+                columns["probability"],
+                columns["expected_amount"],
+                columns["expected_days"],
+            )
+        ]
+
+    def score_arrays(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        with phase("model_call", self.model_name):
+            if self.tables is not None:
+                probabilities, amounts, days, found = self.tables.lookup(
+                    isapre_idx, tipo_idx, totals
+                )
+            else:
+                probabilities, amounts, days = np.empty((3, len(totals)))
+                found = np.zeros(len(totals), dtype=bool)
+
+            # Bayesian networks have a different interface, so query each
+            # distinct (isapre, tipo, total) combination missing from the
+            # tables only once
+            results: dict[tuple, Any] = {}
+            for index in np.flatnonzero(~found):
+                key = (
+                    ISAPRE_VALUES[isapre_idx[index]],
+                    TIPO_VALUES[tipo_idx[index]],
+                    _as_total(totals[index]),
+                )
+                if key not in results:
+                    results[key] = self.model.predict_all(*key)
+                probabilities[index], amounts[index], days[index] = results[key]
+
+        return {
+            "probability": probabilities,
+            "expected_amount": amounts,
+            "expected_days": days,
+        }
 
 
 class GMMAdapter(ModelAdapter):
     """Adapter for Gaussian Mixture Model."""
 
-    async def predict(self, input_data: InferenceInput) -> GMMPrediction:
-        # Prepare data with log transformation
-        gmm_input = {
-            "isapre": input_data.isapre.value,
-            "tipo": input_data.tipo.value,
-            "total": input_data.total,
-            "total_log": np.log1p(input_data.total),
-        }
+    model_name = "gmm"
+
+    def __init__(self, model: Any):
+        super().__init__(model)
+        # Score whole batches with NumPy when the callable can be compiled
+        if isinstance(model, GMMScorer):
+            self.scorer = model
+        else:
+            self.scorer = GMMScorer.from_callable(model)
+
+    def _build_predictions(self, columns: Dict[str, np.ndarray]) -> List[GMMPrediction]:
+        return [
+            GMMPrediction(probability=float(probability))
+            for probability in columns["probability"]
+        ]
+
+    def score_arrays(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        with phase("model_call", self.model_name):
+            if self.scorer is not None:
+                return {"probability": self.scorer.score(isapre_idx, tipo_idx, totals)}
+
+            # The model scores one row at a time, so only score distinct rows
+            results: dict[tuple, float] = {}
+            probabilities = np.empty(len(totals))
+            for index in range(len(totals)):
+                key = (
+                    ISAPRE_VALUES[isapre_idx[index]],
+                    TIPO_VALUES[tipo_idx[index]],
+                    _as_total(totals[index]),
+                )
+                if key not in results:
+                    isapre, tipo, total = key
+                    # Prepare data with log transformation
+                    gmm_input = {
+                        "isapre": isapre,
+                        "tipo": tipo,
+                        "total": total,
+                        "total_log": np.log1p(total),
+                    }
+                    results[key] = float(self.model(pd.Series(gmm_input)))
+                probabilities[index] = results[key]
+
+            return {"probability": probabilities}
 
-        row = pd.Series(gmm_input)
-        probability = float(self.model(row))
 
-        return GMMPrediction(probability=probability)
+def _as_total(total: float) -> Any:
+    """Give row-at-a-time models integer totals, as the API receives them."""
+    return int(total) if float(total).is_integer() else float(total)
 
 
 class ModelAdapterFactory:
@@ -0,0 +1,181 @@
+"""
+Compact model artifacts: compiled scorers stored as plain NumPy arrays.
+
+An artifact is an uncompressed zip file holding a JSON manifest and one
+``.npy`` file per array of a compiled scorer. Loading one never unpickles
+anything, so it doesn't need the libraries the model was trained with, and
+the arrays are memory-mapped straight from the file, which makes loading
+almost free and lets processes share the same pages.
+
+Export a pickled model, from the backend directory, then upload the result
+to R2 as ``<model name>.artifact`` next to the pickle:
+
+    python -m inference.artifacts gmm gmm.pkl gmm.artifact
+
+Exporting needs the model's libraries, since it unpickles the model and
+checks the compiled scorer against it.
+"""
+
+import argparse
+import io
+import json
+import pickle
+import struct
+import sys
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Union
+
+import numpy as np
+
+from .models import CompiledBayesianNetwork, GMMScorer, LogisticScorer
+
+ARTIFACT_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+
+# Scorer class each model compiles to, and how
+SCORERS = {
+    "logistic_regressor": (LogisticScorer, LogisticScorer.from_pipeline),
+    "discrete_bayesian_network": (
+        CompiledBayesianNetwork,
+        CompiledBayesianNetwork.compile,
+    ),
+    "gmm": (GMMScorer, GMMScorer.from_callable),
+}
+
+Scorer = Union[LogisticScorer, CompiledBayesianNetwork, GMMScorer]
+
+# Array data starts at multiples of this many bytes in the file
+_ALIGNMENT = 64
+_LOCAL_HEADER = struct.Struct("<4s22xHH")
+_PADDING_HEADER_ID = 0xD935
+
+
+def is_artifact(path: Path) -> bool:
+    """Whether a file is an artifact rather than a pickle."""
+    with open(path, "rb") as f:
+        return f.read(4) == b"PK\x03\x04"
+
+
+def compile_model(model_name: str, model: Any) -> Scorer:
+    """Compile a model to the scorer its artifact holds."""
+    if model_name not in SCORERS:
+        raise ValueError(f"Unknown model type: {model_name}")
+    scorer = SCORERS[model_name][1](model)
+    if scorer is None:
+        raise ValueError(f"Model {model_name} can't be compiled to an artifact")
+    # The adapter only falls back to the network for totals outside the tables
+    if isinstance(scorer, CompiledBayesianNetwork) and not scorer.covers_all_totals():
+        raise ValueError(f"Model {model_name} needs the network for some totals")
+    return scorer
+
+
+def write_artifact(model_name: str, scorer: Scorer, path: Path) -> None:
+    """Write a compiled scorer to an artifact file."""
+    params, arrays = scorer.to_artifact()
+    manifest = {
+        "format": ARTIFACT_FORMAT,
+        "model": model_name,
+        "scorer": type(scorer).__name__,
+        "params": params,
+        "arrays": sorted(arrays),
+    }
+
+    with open(path, "wb") as f, zipfile.ZipFile(f, "w", zipfile.ZIP_STORED) as zf:
+        zf.writestr(MANIFEST_NAME, json.dumps(manifest, indent=2))
+        for name, array in sorted(arrays.items()):
+            buffer = io.BytesIO()
+            np.lib.format.write_array(
+                buffer, np.ascontiguousarray(array), allow_pickle=False
+            )
+            info = zipfile.ZipInfo(f"{name}.npy")
+            # Pad the local header so the array lands on an aligned offset;
+            # .npy headers are themselves padded to a multiple of 64 bytes
+            start = f.tell() + _LOCAL_HEADER.size + len(info.filename.encode()) + 4
+            padding = -start % _ALIGNMENT
+            info.extra = struct.pack("<HH", _PADDING_HEADER_ID, padding)
+            info.extra += bytes(padding)
+            zf.writestr(info, buffer.getvalue())
+
+
+def load_artifact(path: Path, mmap: bool = True) -> Scorer:
+    """Load the compiled scorer stored in an artifact file."""
+    with zipfile.ZipFile(path) as zf:
+        manifest = json.loads(zf.read(MANIFEST_NAME))
+        members = {info.filename: info for info in zf.infolist()}
+
+    if manifest.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported artifact format: {manifest.get('format')}")
+    scorer_class = SCORERS[manifest["model"]][0]
+    if manifest["scorer"] != scorer_class.__name__:
+        raise ValueError(f"Unexpected scorer for {manifest['model']} artifact")
+
+    arrays = {}
+    with open(path, "rb") as f:
+        for name in manifest["arrays"]:
+            info = members[f"{name}.npy"]
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Array {name} is compressed")
+            arrays[name] = _read_array(f, path, info.header_offset, mmap)
+
+    return scorer_class.from_artifact(manifest["params"], arrays)
+
+
+def _read_array(f, path: Path, header_offset: int, mmap: bool) -> np.ndarray:
+    """Read, or map read-only, the .npy member whose local header is at an offset."""
+    f.seek(header_offset)
+    signature, name_length, extra_length = _LOCAL_HEADER.unpack(
+        f.read(_LOCAL_HEADER.size)
+    )
+    if signature != b"PK\x03\x04":
+        raise ValueError("Corrupted artifact")
+    f.seek(name_length + extra_length, io.SEEK_CUR)
+
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if dtype.hasobject:
+        raise ValueError("Artifacts can't hold object arrays")
+
+    order = "F" if fortran_order else "C"
+    count = int(np.prod(shape))
+    if not mmap or count == 0:
+        array = np.fromfile(f, dtype=dtype, count=count)
+        return array.reshape(shape, order=order)
+    mapped = np.memmap(
+        path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order=order
+    )
+    return mapped.view(np.ndarray)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Export a pickled model to a compact artifact."
+    )
+    parser.add_argument("model", choices=list(SCORERS), help="Model name")
+    parser.add_argument("input", type=Path, help="Pickled model file")
+    parser.add_argument("output", type=Path, help="Artifact file to write")
+    args = parser.parse_args(argv)
+
+    with open(args.input, "rb") as f:
+        model = pickle.load(f)
+    try:
+        scorer = compile_model(args.model, model)
+    except ValueError as e:
+        sys.exit(str(e))
+    write_artifact(args.model, scorer, args.output)
+
+    started = time.perf_counter()
+    load_artifact(args.output)
+    print(
+        f"Wrote {args.output} ({args.output.stat().st_size:,} bytes, pickle was "
+        f"{args.input.stat().st_size:,}), loads in "
+        f"{(time.perf_counter() - started) * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .metrics import micro_batch_size
+from .schemas import InferenceInput
+
+# Scores a batch of inputs, returning one result per input in order
+ScoreBatch = Callable[[List[InferenceInput]], Awaitable[List[Any]]]
+
+
+class MicroBatcher:
+    """
+    Scores concurrent single predictions together in small batches.
+
+    A prediction is sent right away while fewer than ``max_in_flight``
+    batches are being scored, so at low load nothing waits. Once that many
+    are running, predictions queue up and go out together as soon as a batch
+    finishes, the queue reaches ``max_batch_size`` or the oldest has waited
+    ``max_wait`` seconds. Batches therefore grow with the arrival rate, and
+    so does the work each fixed model call cost is spread over.
+    """
+
+    def __init__(
+        self,
+        score_batch: ScoreBatch,
+        max_batch_size: int,
+        max_wait: float,
+        max_in_flight: int = 1,
+    ):
+        self.score_batch = score_batch
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait = max_wait
+        self.max_in_flight = max(max_in_flight, 1)
+        self._pending: List[Tuple[InferenceInput, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.in_flight = 0
+        self.batches = 0
+        self.predictions = 0
+
+    async def predict(self, input_data: InferenceInput) -> Any:
+        """Score one input as part of the next batch."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((input_data, future))
+
+        if (
+            self.in_flight < self.max_in_flight
+            or len(self._pending) >= self.max_batch_size
+        ):
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush
+            )
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send the oldest queued predictions, up to a full batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending[: self.max_batch_size]
+        del self._pending[: self.max_batch_size]
+        if not batch:
+            return
+
+        self.in_flight += 1
+        asyncio.ensure_future(self._run(batch))
+
+        # Whatever is left over waits for the next slot or the window
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush
+            )
+
+    async def _run(self, batch: List[Tuple[InferenceInput, asyncio.Future]]) -> None:
+        """Score a batch and hand each caller its own response."""
+        self.batches += 1
+        self.predictions += len(batch)
+        micro_batch_size.observe(len(batch))
+        try:
+            results = await self.score_batch([input_data for input_data, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future), result in zip(batch, results):
+                # Callers may have been cancelled while the batch ran
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self.in_flight -= 1
+            if self._pending:
+                self._flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batch counters."""
+        return {
+            "batches": self.batches,
+            "predictions": self.predictions,
+            "mean_batch_size": self.predictions / self.batches if self.batches else 0,
+            "queued": len(self._pending),
+            "in_flight": self.in_flight,
+        }
@@ -1,19 +1,96 @@
+import asyncio
+import fcntl
+import hashlib
+import importlib
+import json
+import os
 import pickle
+import sys
+import tempfile
+import threading
+import time
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 from fastapi import HTTPException
 
 from cloudflare.client import R2Client
+from .config import settings
+from .metrics import (
+    model_cache_lookups,
+    model_load_duration,
+    model_unpickle_duration,
+    r2_download_bytes,
+    r2_download_duration,
+)
+from .singleflight import SingleFlight
+
+# Partial downloads untouched for this long were left behind by a crashed
+# process; younger ones may belong to another worker sharing the directory
+STALE_PART_SECONDS = 3600
+
+# Extension of each model file format, locally and in R2
+MODEL_EXTENSIONS = {"pickle": ".pkl", "artifact": ".artifact"}
+
+# Unpickling imports the models' libraries, and importing the same packages
+# from several threads at once can fail half-way (sklearn's circular imports
+# do), so those imports take turns while the unpickling itself doesn't
+_import_lock = threading.Lock()
+
+
+class _ModelUnpickler(pickle.Unpickler):
+    """Unpickler that imports the modules it needs one thread at a time."""
+
+    def find_class(self, module: str, name: str) -> Any:
+        if module not in sys.modules:
+            with _import_lock:
+                importlib.import_module(module)
+        return super().find_class(module, name)
 
 
 class ModelCache:
-    """Cache service for machine learning models with R2 backend."""
+    """
+    Cache service for machine learning models with R2 backend.
+
+    In shared mode the disk cache can be used by several processes at once,
+    such as uvicorn workers or containers sharing a volume. A lock file per
+    model lets only one process download each version, while the others
+    wait and then load its result. Models are stored as content-addressed
+    joblib files that are never overwritten, next to a small pointer file
+    naming the current one, and are loaded with their NumPy arrays
+    memory-mapped so every process shares the same pages.
+
+    With the artifact format, models are compiled scorers stored as plain
+    NumPy arrays (see ``inference.artifacts``) instead of pickles, and are
+    loaded without unpickling anything.
+    """
 
-    def __init__(self, cache_dir: str = "/tmp/model_cache"):
+    def __init__(
+        self,
+        cache_dir: str = "/tmp/model_cache",
+        shared: bool = False,
+        model_format: str = "pickle",
+    ):
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
+        self.shared = shared
+        self.model_format = model_format
+        self.extension = MODEL_EXTENSIONS[model_format]
+        # Remove partial downloads left behind by a crashed process. Shared
+        # caches clean up under the model's lock instead
+        if not shared:
+            stale_before = time.time() - STALE_PART_SECONDS
+            for part_file in self.cache_dir.glob(".*.part"):
+                try:
+                    if part_file.stat().st_mtime < stale_before:
+                        part_file.unlink(missing_ok=True)
+                except FileNotFoundError:
+                    pass
         self._cache: dict[str, Any] = {}
+        self._versions: dict[str, Optional[str]] = {}
+        self._fingerprints: dict[str, str] = {}
         self._r2_client: Optional[R2Client] = None
+        self._loads = SingleFlight()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "downloads": 0}
 
     def _get_r2_client(self) -> R2Client:
         """Get or create R2 client."""
@@ -23,25 +100,48 @@ class ModelCache:
 
     def _get_cache_path(self, model_name: str) -> Path:
         """Get the local cache path for a model."""
-        return self.cache_dir / f"{model_name}.pkl"
+        return self.cache_dir / f"{model_name}{self.extension}"
+
+    def _get_version_path(self, model_name: str) -> Path:
+        """Get the local path recording the R2 version of a cached model."""
+        return self.cache_dir / f"{model_name}.version"
 
     async def _download_model(self, model_name: str) -> Any:
         """Download model from R2 and save to cache."""
         try:
             r2_client = self._get_r2_client()
-            model_bytes = await r2_client.download_file(model_name)
 
-            # Save to local cache
+            # Stream straight into the local cache, which is replaced atomically
+            started = time.perf_counter()
             cache_path = self._get_cache_path(model_name)
-            with open(cache_path, "wb") as f:
-                f.write(model_bytes)
+            version = await r2_client.download_to_file(
+                model_name, cache_path, self.extension
+            )
+            self._get_version_path(model_name).write_text(version or "")
+            r2_download_duration.labels(model_name).observe(
+                time.perf_counter() - started
+            )
+            r2_download_bytes.labels(model_name).inc(cache_path.stat().st_size)
 
             # Load and return model
-            model = pickle.loads(model_bytes)
+            loop = asyncio.get_running_loop()
+            model = await loop.run_in_executor(
+                None, self._load_file, cache_path, self.model_format
+            )
             self._cache[model_name] = model
+            self._versions[model_name] = version
+            self._fingerprints[model_name] = version or await loop.run_in_executor(
+                None, _file_digest, cache_path
+            )
+            self._stats["downloads"] += 1
+            model_cache_lookups.labels(model_name, "r2", "hit").inc()
+            model_load_duration.labels(model_name, "r2").observe(
+                time.perf_counter() - started
+            )
             return model
 
         except Exception as e:
+            model_cache_lookups.labels(model_name, "r2", "miss").inc()
             raise HTTPException(
                 status_code=500,
                 detail=f"Failed to download model {model_name}: {str(e)}",
@@ -51,29 +151,340 @@ class ModelCache:
         """Get model from cache or download from R2."""
         # Check in-memory cache first
         if model_name in self._cache:
+            self._stats["memory_hits"] += 1
+            model_cache_lookups.labels(model_name, "memory", "hit").inc()
             return self._cache[model_name]
 
+        model_cache_lookups.labels(model_name, "memory", "miss").inc()
+
+        # Only one load per model at a time, concurrent callers share it
+        return await self._loads.do(model_name, lambda: self._load_model(model_name))
+
+    async def _load_model(self, model_name: str) -> Any:
+        """Load model from the local file cache or download it from R2."""
+        if self.shared:
+            return await self._load_shared_model(model_name)
+
         # Check local file cache
         cache_path = self._get_cache_path(model_name)
         if cache_path.exists():
             try:
-                with open(cache_path, "rb") as f:
-                    model = pickle.load(f)
+                started = time.perf_counter()
+                loop = asyncio.get_running_loop()
+                model = await loop.run_in_executor(
+                    None, self._load_file, cache_path, self.model_format
+                )
+                version = self._read_version(model_name)
                 self._cache[model_name] = model
+                self._versions[model_name] = version
+                # Files cached before versions were recorded have none
+                self._fingerprints[model_name] = version or await loop.run_in_executor(
+                    None, _file_digest, cache_path
+                )
+                self._stats["disk_hits"] += 1
+                model_cache_lookups.labels(model_name, "disk", "hit").inc()
+                model_load_duration.labels(model_name, "disk").observe(
+                    time.perf_counter() - started
+                )
                 return model
             except Exception:
                 # If cache is corrupted, remove it and download fresh
                 cache_path.unlink(missing_ok=True)
 
+        model_cache_lookups.labels(model_name, "disk", "miss").inc()
+
         # Download from R2
         return await self._download_model(model_name)
 
+    def _read_version(self, model_name: str) -> Optional[str]:
+        """Read the recorded R2 version of a cached model file."""
+        version_path = self._get_version_path(model_name)
+        if not version_path.exists():
+            return None
+        return version_path.read_text().strip() or None
+
+    def get_version(self, model_name: str) -> Optional[str]:
+        """Get the R2 version of the model currently held in memory."""
+        return self._versions.get(model_name)
+
+    def get_fingerprint(self, model_name: str) -> Optional[str]:
+        """
+        Get an identifier of the model currently held in memory: its R2
+        version, or a hash of its file's content when the version is unknown.
+        """
+        return self._fingerprints.get(model_name)
+
+    async def get_remote_version(self, model_name: str) -> Optional[str]:
+        """Get the version of a model currently stored in R2."""
+        return await self._get_r2_client().get_file_version(model_name, self.extension)
+
+    async def refresh_model(self, model_name: str) -> Any:
+        """Download the latest version of a model from R2."""
+        # Its own flight, so a refresh never joins a load of the old version
+        key = f"{model_name}:refresh"
+        if self.shared:
+            return await self._loads.do(
+                key, lambda: self._load_shared_model(model_name, refresh=True)
+            )
+        return await self._loads.do(key, lambda: self._download_model(model_name))
+
+    def _get_objects_dir(self) -> Path:
+        """Directory of the content-addressed model files of a shared cache."""
+        objects_dir = self.cache_dir / "objects"
+        objects_dir.mkdir(exist_ok=True)
+        return objects_dir
+
+    def _get_pointer_path(self, model_name: str) -> Path:
+        """Get the path naming the current file and version of a shared model."""
+        return self.cache_dir / f"{model_name}.json"
+
+    def _read_pointer(self, model_name: str) -> Optional[Dict[str, Any]]:
+        """Read a shared model's pointer, if it names a file that exists."""
+        try:
+            pointer = json.loads(self._get_pointer_path(model_name).read_text())
+        except (OSError, ValueError):
+            return None
+        if not (self.cache_dir / pointer["file"]).exists():
+            return None
+        return pointer
+
+    async def _load_shared_model(self, model_name: str, refresh: bool = False) -> Any:
+        """Load a model through the shared cache, downloading it at most once."""
+        loop = asyncio.get_running_loop()
+        pointer = None if refresh else self._read_pointer(model_name)
+        source = "disk"
+
+        if pointer is None:
+            if not refresh:
+                model_cache_lookups.labels(model_name, "disk", "miss").inc()
+            lock_file = open(self.cache_dir / f"{model_name}.lock", "a")
+            try:
+                # Blocks while another process downloads this model
+                await loop.run_in_executor(
+                    None, fcntl.flock, lock_file.fileno(), fcntl.LOCK_EX
+                )
+                pointer = self._read_pointer(model_name)
+                if pointer is not None and refresh:
+                    remote_version = await self.get_remote_version(model_name)
+                    if remote_version != pointer.get("version"):
+                        pointer = None
+                if pointer is None:
+                    pointer = await self._download_shared_model(model_name)
+                    source = "r2"
+            finally:
+                # Closing the file releases the lock
+                lock_file.close()
+
+        started = time.perf_counter()
+        try:
+            model = await loop.run_in_executor(
+                None,
+                self._load_object,
+                self.cache_dir / pointer["file"],
+                model_name,
+                self.model_format,
+            )
+        except Exception:
+            if source != "disk":
+                raise
+            # If the cached file is corrupted, drop the pointer and download
+            # it again; a fresh copy gets the same content-addressed name
+            self._get_pointer_path(model_name).unlink(missing_ok=True)
+            (self.cache_dir / pointer["file"]).unlink(missing_ok=True)
+            return await self._load_shared_model(model_name)
+        self._cache[model_name] = model
+        self._versions[model_name] = pointer.get("version")
+        # Object files are named after the hash of their content
+        self._fingerprints[model_name] = pointer.get("version") or (
+            Path(pointer["file"]).stem.rsplit("-", 1)[-1]
+        )
+        if source == "disk":
+            self._stats["disk_hits"] += 1
+            model_cache_lookups.labels(model_name, "disk", "hit").inc()
+        model_load_duration.labels(model_name, source).observe(
+            time.perf_counter() - started
+        )
+        return model
+
+    async def _download_shared_model(self, model_name: str) -> Dict[str, Any]:
+        """Download a model into the shared cache; the caller holds its lock."""
+        objects_dir = self._get_objects_dir()
+        # Named after the model, which labels its unpickle timing
+        download_path = objects_dir / f"{model_name}{self.extension}"
+        # Only the lock holder downloads, so leftovers are from a crash
+        for part_file in objects_dir.glob(f".{download_path.name}.*.part"):
+            part_file.unlink(missing_ok=True)
+
+        try:
+            started = time.perf_counter()
+            version = await self._get_r2_client().download_to_file(
+                model_name, download_path, self.extension
+            )
+            r2_download_duration.labels(model_name).observe(
+                time.perf_counter() - started
+            )
+            r2_download_bytes.labels(model_name).inc(download_path.stat().st_size)
+
+            object_path = await asyncio.get_running_loop().run_in_executor(
+                None, self._store_object, model_name, download_path
+            )
+        except Exception as e:
+            model_cache_lookups.labels(model_name, "r2", "miss").inc()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Failed to download model {model_name}: {str(e)}",
+            )
+        finally:
+            download_path.unlink(missing_ok=True)
+
+        pointer = {
+            "version": version,
+            "file": str(object_path.relative_to(self.cache_dir)),
+        }
+        _write_atomic(self._get_pointer_path(model_name), json.dumps(pointer))
+        self._remove_old_objects(model_name, keep=object_path)
+        self._stats["downloads"] += 1
+        model_cache_lookups.labels(model_name, "r2", "hit").inc()
+        return pointer
+
+    def _store_object(self, model_name: str, download_path: Path) -> Path:
+        """
+        Store a downloaded model as a content-addressed file: artifacts as
+        they are, pickles converted to joblib files.
+        """
+        import joblib
+        from .artifacts import is_artifact
+
+        artifact = is_artifact(download_path)
+        if self.model_format == "artifact" and not artifact:
+            raise ValueError(f"Model {model_name} in R2 is not an artifact")
+        suffix = ".artifact" if artifact else ".joblib"
+        object_path = (
+            self._get_objects_dir()
+            / f"{model_name}-{_file_digest(download_path)}{suffix}"
+        )
+        # Same content, same file: an unchanged model is never stored twice
+        if object_path.exists():
+            return object_path
+
+        model = self._load_file(download_path, self.model_format)
+        if artifact:
+            os.replace(download_path, object_path)
+            return object_path
+
+        fd, temp_path = tempfile.mkstemp(
+            dir=object_path.parent, prefix=f".{object_path.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                joblib.dump(model, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, object_path)
+        finally:
+            Path(temp_path).unlink(missing_ok=True)
+        return object_path
+
+    def _remove_old_objects(self, model_name: str, keep: Path) -> None:
+        """Delete a model's files other than the current and previous ones."""
+        # Processes still using an older file keep their mapping after unlink
+        objects = sorted(
+            self._get_objects_dir().glob(f"{model_name}-*"),
+            key=lambda path: path.stat().st_mtime,
+            reverse=True,
+        )
+        for path in [p for p in objects if p != keep][1:]:
+            path.unlink(missing_ok=True)
+
+    @staticmethod
+    def _load_object(object_path: Path, model_name: str, model_format: str) -> Any:
+        """Load a stored model file with its arrays memory-mapped."""
+        import joblib
+        from .artifacts import load_artifact
+
+        if object_path.suffix == ".artifact":
+            with model_unpickle_duration.labels(model_name).time():
+                return load_artifact(object_path)
+        # Artifact caches never unpickle, whatever the pointer names
+        if model_format == "artifact":
+            raise ValueError(f"{object_path.name} is not an artifact")
+
+        # joblib's unpickler can't take our find_class, so these loads take
+        # turns; their arrays are mapped rather than read, which keeps it short
+        with _import_lock, model_unpickle_duration.labels(model_name).time():
+            # Copy-on-write mappings: pages are shared between processes
+            # until something writes to them
+            return joblib.load(object_path, mmap_mode="c")
+
+    @staticmethod
+    def _load_file(cache_path: Path, model_format: str) -> Any:
+        """
+        Load a model artifact, or unpickle a model, from disk. Artifact caches
+        only ever load artifacts, so they never unpickle anything.
+        """
+        from .artifacts import is_artifact, load_artifact
+
+        if is_artifact(cache_path):
+            with model_unpickle_duration.labels(cache_path.stem).time():
+                return load_artifact(cache_path)
+        if model_format == "artifact":
+            raise ValueError(f"{cache_path.name} is not an artifact")
+
+        with model_unpickle_duration.labels(cache_path.stem).time():
+            with open(cache_path, "rb") as f:
+                return _ModelUnpickler(f).load()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache hit, load and coalescing counters."""
+        return {
+            **self._stats,
+            "loads_started": self._loads.started,
+            "loads_coalesced": self._loads.coalesced,
+            "loads_in_flight": self._loads.in_flight(),
+        }
+
     async def clear_cache(self) -> None:
         """Clear all cached models."""
         self._cache.clear()
-        for cache_file in self.cache_dir.glob("*.pkl"):
-            cache_file.unlink(missing_ok=True)
+        self._versions.clear()
+        self._fingerprints.clear()
+        for extension in MODEL_EXTENSIONS.values():
+            for cache_file in self.cache_dir.glob(f"*{extension}"):
+                cache_file.unlink(missing_ok=True)
+        for version_file in self.cache_dir.glob("*.version"):
+            version_file.unlink(missing_ok=True)
+        if self.shared:
+            for pointer_file in self.cache_dir.glob("*.json"):
+                pointer_file.unlink(missing_ok=True)
+            for object_file in self._get_objects_dir().iterdir():
+                object_file.unlink(missing_ok=True)
+
+
+def _file_digest(path: Path) -> str:
+    """SHA-256 of a file's content, in hex."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    """Replace a file's contents so readers see either the old or new text."""
+    fd, temp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
 
 
 # Global cache instance
-model_cache = ModelCache()
+model_cache = ModelCache(
+    settings.MODEL_CACHE_DIR,
+    shared=settings.MODEL_CACHE_SHARED,
+    model_format=settings.MODEL_FORMAT,
+)
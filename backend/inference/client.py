@@ -1,54 +1,303 @@
-import pickle
-import pandas as pd
+"""
+Offline batch scoring of CSV or Parquet claim files.
+
+Usage, from the backend directory:
+
+    python -m inference.client claims.csv scored.parquet --models lr,bn --workers 8
+
+Models are fetched through the model cache and compiled once in the parent,
+then shared copy-on-write with a pool of forked workers that score the input
+in chunks with the vectorized adapter paths. Output rows keep the input order
+and columns, followed by an ``errors`` column for rows that could not be
+scored and one column per model output, named and rounded as in the
+``/predict/stream`` CSV.
+"""
+
+import argparse
+import asyncio
+import gc
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Annotated, Any, Dict, Iterator, List, Optional, Tuple
+
 import numpy as np
+import pandas as pd
+from pydantic import TypeAdapter, ValidationError
 
+from .adapters import ModelAdapter, ModelAdapterFactory
+from .cache import model_cache
+from .models import ISAPRE_INDEX, TIPO_INDEX
+from .schemas import InferenceInput
 
-class InferenceClient:
-    def __init__(self, model_path: str):
-        self.model = pickle.load(open(model_path, "rb"))
+# Prefix of each model's output columns, also accepted by --models
+MODEL_PREFIXES = {
+    "logistic_regressor": "lr",
+    "discrete_bayesian_network": "bn",
+    "gmm": "gmm",
+}
 
-    def predict(self, data: dict) -> dict:
-        return self.model.predict(data)
+INPUT_COLUMNS = ["isapre", "tipo", "total"]
 
-    def predict_proba(self, data: dict) -> dict:
-        return self.model.predict_proba(data)
+# Output columns of each model as (name, adapter output, dtype); integer
+# columns are nullable, as rows that fail validation have no score
+OUTPUT_COLUMNS = {
+    "logistic_regressor": [
+        ("lr_probability", "probability", "float64"),
+        ("lr_chosen_class", "predicted_class", "Int64"),
+    ],
+    "discrete_bayesian_network": [
+        ("bn_probability", "probability", "float64"),
+        ("bn_expected_reimbursement", "expected_amount", "Int64"),
+        ("bn_expected_wait", "expected_days", "Int64"),
+    ],
+    "gmm": [("gmm_probability", "probability", "float64")],
+}
 
+# Adapters loaded by the parent before forking, shared copy-on-write
+_adapters: Dict[str, ModelAdapter] = {}
 
-probe = pd.DataFrame(
-    [
-        {
-            "isapre": "FONASA",  # <- string, exactly as it appears in X_train
-            "tipo": "Hora Médica",  # <- another category
-            "total": 100_000,  # <- integer CLP
-        }
-    ]
-)
+# Validates one total exactly like the API does
+_total_field = InferenceInput.model_fields["total"]
+_total_adapter = TypeAdapter(Annotated[_total_field.annotation, _total_field])
 
 
-if __name__ == "__main__":
-    client = InferenceClient("logistic_regressor.pkl")
-    print(f"P(reembolso)  = {client.predict_proba(probe)[0,1]:.3f}")
-    print(f"Class chosen  = {client.predict(probe)[0]}  (1 = habrá, 0 = no)")
+def score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Validate and score one chunk with every loaded adapter."""
+    isapre_idx = chunk["isapre"].astype(object).map(ISAPRE_INDEX)
+    tipo_idx = chunk["tipo"].astype(object).map(TIPO_INDEX)
+    totals, valid_totals = validate_totals(chunk["total"])
+
+    invalid = {
+        "isapre": isapre_idx.isna(),
+        "tipo": tipo_idx.isna(),
+        "total": pd.Series(~valid_totals, index=chunk.index),
+    }
+    valid = ~(invalid["isapre"] | invalid["tipo"] | invalid["total"]).to_numpy()
 
-    client = InferenceClient("discrete_bayesian_network.pkl")
-    reembolso_bn = pickle.load(open("discrete_bayesian_network.pkl", "rb"))
+    result = chunk.copy()
+    errors = pd.Series("", index=chunk.index, dtype=object)
+    for column, mask in invalid.items():
+        errors[mask] = errors[mask] + f"invalid {column}; "
+    result["errors"] = errors.str.rstrip("; ")
 
-    p, monto, dias = reembolso_bn.predict_all(
-        "Cruz Blanca", "Examen / Imágenes", 58_000
+    arrays = (
+        isapre_idx[valid].to_numpy(dtype=int),
+        tipo_idx[valid].to_numpy(dtype=int),
+        totals[valid],
     )
+    for model_name, adapter in _adapters.items():
+        # Every chunk gets every column, so CSV headers and Parquet schemas
+        # match even when no row of a chunk is valid
+        outputs = adapter.score_arrays(*arrays) if valid.any() else {}
+        for name, output, dtype in OUTPUT_COLUMNS[model_name]:
+            column = np.full(len(chunk), np.nan)
+            if output in outputs:
+                column[valid] = outputs[output]
+            if dtype == "Int64":
+                # Truncated like the API responses
+                column = np.trunc(column)
+            result[name] = pd.array(column, dtype=dtype)
+
+    return result
+
+
+def validate_totals(totals: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Validate totals like ``InferenceInput.total``: positive integers, which
+    may come as whole floats or integer strings.
+
+    Returns the totals as floats and a mask of the valid ones.
+    """
+    if pd.api.types.is_numeric_dtype(totals):
+        values = totals.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid="ignore"):
+            valid = np.isfinite(values) & (values > 0) & (values == np.floor(values))
+        return values, valid
 
-    print(f"Probabilidad de reembolso  : {p:.2%}")
-    print(f"Monto esperado (CLP)       : ${monto:,.0f}")
-    print(f"Días para aprobación (mean): {dias:.1f}")
+    # Mixed or text columns go through the schema value by value
+    values = np.full(len(totals), np.nan)
+    for i, value in enumerate(totals.to_numpy(dtype=object)):
+        try:
+            values[i] = _total_adapter.validate_python(value)
+        except ValidationError:
+            pass
+    return values, ~np.isnan(values)
 
-    gmm_input = {
-        "isapre": "FONASA",
-        "tipo": "Medicamentos",
-        "total": 60_000,
+
+def _score_chunk_task(
+    chunk: pd.DataFrame, output_format: str, header: bool
+) -> Tuple[Any, int, int]:
+    """Score a chunk in a worker, also encoding it there when writing CSV."""
+    scored = score_chunk(chunk)
+    invalid = int((scored["errors"] != "").sum())
+    if output_format == "csv":
+        return scored.to_csv(index=False, header=header), len(scored), invalid
+    return scored, len(scored), invalid
+
+
+def load_adapters(model_names: List[str]) -> Dict[str, ModelAdapter]:
+    """Fetch models through the model cache and build their adapters."""
+
+    async def load() -> List[Any]:
+        return await asyncio.gather(
+            *(model_cache.get_model(model_name) for model_name in model_names)
+        )
+
+    models = asyncio.run(load())
+    return {
+        model_name: ModelAdapterFactory.create_adapter(model_name, model)
+        for model_name, model in zip(model_names, models)
     }
-    gmm_input["total_log"] = np.log1p(gmm_input["total"])
-    row = pd.Series(gmm_input)
 
-    row_proba = pickle.load(open("gmm.pkl", "rb"))
-    p = row_proba(row)
-    print(f"Model P(approved) = {p:.3%}")
+
+def read_chunks(path: Path, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Read a CSV or Parquet file lazily in chunks of rows."""
+    if _file_format(path) == "parquet":
+        parquet = _import_pyarrow_parquet()
+        for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+        return
+
+    yield from pd.read_csv(
+        path, chunksize=chunk_size, dtype={"isapre": str, "tipo": str}
+    )
+
+
+class ChunkWriter:
+    """Append scored chunks, as encoded CSV text or DataFrames, to a file."""
+
+    def __init__(self, path: Path):
+        self.format = _file_format(path)
+        self.path = path
+        self._csv_file = open(path, "w", newline="") if self.format == "csv" else None
+        self._parquet_writer: Optional[Any] = None
+
+    def write(self, chunk: Any) -> None:
+        if self._csv_file is not None:
+            self._csv_file.write(chunk)
+            return
+
+        import pyarrow
+
+        parquet = _import_pyarrow_parquet()
+        table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+        if self._parquet_writer is None:
+            self._parquet_writer = parquet.ParquetWriter(self.path, table.schema)
+        self._parquet_writer.write_table(table.cast(self._parquet_writer.schema))
+
+    def close(self) -> None:
+        if self._csv_file is not None:
+            self._csv_file.close()
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+
+def _file_format(path: Path) -> str:
+    return "parquet" if path.suffix.lower() in (".parquet", ".pq") else "csv"
+
+
+def _import_pyarrow_parquet() -> Any:
+    try:
+        import pyarrow.parquet
+    except ImportError:
+        sys.exit("Parquet files need pyarrow: uv sync --extra parquet")
+    return pyarrow.parquet
+
+
+def _parse_models(value: str) -> List[str]:
+    aliases = {prefix: name for name, prefix in MODEL_PREFIXES.items()}
+    model_names = []
+    for name in value.split(","):
+        name = aliases.get(name.strip(), name.strip())
+        if name not in MODEL_PREFIXES:
+            raise argparse.ArgumentTypeError(
+                f"unknown model {name!r}, expected one of: " + ", ".join(aliases)
+            )
+        if name not in model_names:
+            model_names.append(name)
+    return model_names
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Score a CSV or Parquet file of claims offline."
+    )
+    parser.add_argument("input", type=Path, help="CSV or Parquet file")
+    parser.add_argument("output", type=Path, help="CSV or Parquet file to write")
+    parser.add_argument(
+        "--models",
+        type=_parse_models,
+        default=list(MODEL_PREFIXES),
+        help="Comma-separated models to run (lr, bn, gmm or full names)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Scoring processes (default: one per CPU)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args(argv)
+
+    # Fail on missing Parquet support before spending time loading models
+    if "parquet" in (_file_format(args.input), _file_format(args.output)):
+        _import_pyarrow_parquet()
+
+    started = time.perf_counter()
+    _adapters.update(load_adapters(args.models))
+    load_seconds = time.perf_counter() - started
+    print(f"Loaded {', '.join(args.models)} in {load_seconds:.2f}s")
+
+    # Keep the loaded models out of the collector's reach so the workers'
+    # garbage collections don't copy the shared pages
+    gc.collect()
+    gc.freeze()
+
+    rows = invalid = 0
+    writer = ChunkWriter(args.output)
+    started = time.perf_counter()
+
+    def write(future: Future) -> None:
+        nonlocal rows, invalid
+        scored, chunk_rows, chunk_invalid = future.result()
+        writer.write(scored)
+        rows += chunk_rows
+        invalid += chunk_invalid
+        rate = rows / (time.perf_counter() - started)
+        print(f"Scored {rows:,} rows ({rate:,.0f} rows/s)")
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("fork")
+    ) as pool:
+        # Bound the chunks in flight so memory doesn't grow with the input,
+        # and write them back in input order
+        pending: deque = deque()
+        for index, chunk in enumerate(read_chunks(args.input, args.chunk_size)):
+            missing = set(INPUT_COLUMNS) - set(chunk.columns)
+            if missing:
+                sys.exit(f"Input is missing columns: {', '.join(sorted(missing))}")
+
+            pending.append(
+                pool.submit(_score_chunk_task, chunk, writer.format, index == 0)
+            )
+            if len(pending) >= 2 * args.workers:
+                write(pending.popleft())
+
+        while pending:
+            write(pending.popleft())
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Scored {rows:,} rows ({invalid:,} invalid) with {args.workers} workers "
+        f"in {elapsed:.2f}s: {rows / elapsed if elapsed else 0:,.0f} rows/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
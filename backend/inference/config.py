@@ -0,0 +1,80 @@
+from typing import Literal, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class InferenceSettings(BaseSettings):
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # Local model cache. A shared cache can be used by several processes on
+    # the same host or volume: each model version is downloaded once, under
+    # a lock file, and loaded memory-mapped
+    MODEL_CACHE_DIR: str = "/tmp/model_cache"
+    MODEL_CACHE_SHARED: bool = False
+
+    # Model files to fetch from R2: pickles, or compact artifacts exported with
+    # ``python -m inference.artifacts``, which load without unpickling
+    MODEL_FORMAT: Literal["pickle", "artifact"] = "pickle"
+
+    # Where CPU-bound model calls run: a thread pool, a pool of forked
+    # processes, or directly on the event loop
+    INFERENCE_EXECUTOR: Literal["thread", "process", "none"] = "thread"
+    INFERENCE_MAX_WORKERS: Optional[int] = None
+
+    # Number of forked scoring processes sharing preloaded models; 0 scores
+    # requests in this process
+    INFERENCE_WORKER_PROCESSES: int = 0
+
+    # Preload and warm up every model on startup, retrying failed attempts.
+    # When off, models load on first use and /ready reports ready right away
+    WARMUP_ON_STARTUP: bool = True
+    WARMUP_RETRY_SECONDS: float = 10.0
+
+    # How often to poll R2 for new model versions; 0 disables hot reload
+    MODEL_RELOAD_INTERVAL_SECONDS: float = 0
+
+    # LRU cache of /predict responses; a size of 0 disables it and a TTL of 0
+    # keeps entries until evicted (they're keyed by model version, so reloads
+    # never serve stale answers). Totals can be rounded to a bucket (in CLP)
+    # so nearby amounts share an entry: requests are still scored with their
+    # own total, but a cached answer may have been scored for another total in
+    # the same bucket
+    PREDICTION_CACHE_SIZE: int = 10_000
+    PREDICTION_CACHE_TTL_SECONDS: float = 3600
+    PREDICTION_CACHE_TOTAL_BUCKET: int = 0
+
+    # How long browsers and CDNs may reuse a GET /predict response before
+    # revalidating it with its ETag
+    PREDICTION_HTTP_MAX_AGE_SECONDS: int = 300
+
+    # Score concurrent /predict calls together in batches of up to this size;
+    # 0 disables micro-batching. Calls only queue while MICRO_BATCH_MAX_IN_FLIGHT
+    # batches are already running, and never longer than the max wait
+    MICRO_BATCH_MAX_SIZE: int = 0
+    MICRO_BATCH_MAX_WAIT_SECONDS: float = 0.005
+    MICRO_BATCH_MAX_IN_FLIGHT: int = 2
+
+    # Per-model deadline on /predict, unless the request sets its own; models
+    # missing it are left out of the response and listed as timed out. 0
+    # disables it
+    MODEL_TIMEOUT_SECONDS: float = 0
+
+    # Rows parsed and scored at a time by the streaming bulk endpoint
+    STREAM_CHUNK_SIZE: int = 5_000
+    # Largest file it accepts, in bytes; larger uploads get a 413
+    STREAM_MAX_UPLOAD_BYTES: int = 1024 * 1024 * 1024
+
+    # JSON logs; per-request detail logs are kept for this fraction of requests
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_RATE: float = 1.0
+
+    # Sampling profiler for /predict and /predict/batch: requests sending
+    # PROFILING_TOKEN in the X-Profile header are profiled, as is a random
+    # fraction of requests. Reports are kept in memory for /debug/profiles,
+    # which needs the token; sampled reports are recorded even without one
+    PROFILING_TOKEN: Optional[str] = None
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_INTERVAL_SECONDS: float = 0.001
+    PROFILING_MAX_REPORTS: int = 20
+
+
+settings = InferenceSettings()
@@ -0,0 +1,143 @@
+import asyncio
+import contextvars
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from .config import settings
+from .logs import configure_worker_logging, record_timing
+from .metrics import model_inference_duration, model_inference_rows, scrape_gauge
+from .profiling import active as profiling_active, phase
+from .schemas import InferenceInput
+
+if TYPE_CHECKING:
+    from .adapters import ModelAdapter
+
+
+# Adapters visible to forked worker processes, keyed by model name
+_worker_adapters: Dict[str, "ModelAdapter"] = {}
+
+
+def _score_in_worker(model_name: str, inputs: List[InferenceInput]) -> List[Any]:
+    """Score a batch inside a worker process with its inherited adapter."""
+    return _worker_adapters[model_name].score_batch(inputs)
+
+
+class InferenceExecutor:
+    """Runs CPU-bound model calls off the event loop."""
+
+    def __init__(self, kind: str = "thread", max_workers: Optional[int] = None):
+        if kind not in ("thread", "process", "none"):
+            raise ValueError(f"Unknown executor type: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self._pool: Optional[Executor] = None
+        # Adapters the process pool's workers were forked with
+        self._forked_adapters: Dict[str, "ModelAdapter"] = {}
+        # Batches submitted and not yet finished, only touched on the event loop
+        self.in_flight = 0
+
+    def _get_pool(self, adapter: Optional["ModelAdapter"] = None) -> Executor:
+        """
+        Get or create the worker pool.
+
+        Process workers only have the adapters registered before they were
+        forked, so the pool is replaced the first time it's asked to run an
+        adapter registered since. The old pool still finishes the batches
+        already sent to it.
+        """
+        if (
+            self._pool is not None
+            and adapter is not None
+            and _worker_adapters.get(adapter.model_name) is adapter
+            and self._forked_adapters.get(adapter.model_name) is not adapter
+        ):
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+        if self._pool is None:
+            if self.kind == "process":
+                # Workers are forked so they inherit the loaded adapters
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("fork"),
+                    initializer=configure_worker_logging,
+                )
+                self._forked_adapters = dict(_worker_adapters)
+            else:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="inference"
+                )
+        return self._pool
+
+    def register_adapter(self, adapter: "ModelAdapter") -> None:
+        """Make an adapter available to workers forked from now on."""
+        _worker_adapters[adapter.model_name] = adapter
+
+    async def score_batch(
+        self, adapter: "ModelAdapter", inputs: List[InferenceInput]
+    ) -> List[Any]:
+        """Run ``adapter.score_batch`` on the configured executor."""
+        started = time.perf_counter()
+        self.in_flight += 1
+        try:
+            if self.kind == "none":
+                return adapter.score_batch(inputs)
+
+            loop = asyncio.get_running_loop()
+            if self.kind == "process":
+                # Phases inside the worker process can't be seen from here
+                with phase("model_call", adapter.model_name):
+                    return await loop.run_in_executor(
+                        self._get_pool(adapter),
+                        _score_in_worker,
+                        adapter.model_name,
+                        inputs,
+                    )
+            if profiling_active():
+                # Carry the profile over to the worker thread
+                return await loop.run_in_executor(
+                    self._get_pool(),
+                    contextvars.copy_context().run,
+                    adapter.score_batch,
+                    inputs,
+                )
+            return await loop.run_in_executor(
+                self._get_pool(), adapter.score_batch, inputs
+            )
+        finally:
+            self.in_flight -= 1
+            duration = time.perf_counter() - started
+            model_inference_duration.labels(adapter.model_name).observe(duration)
+            record_timing(adapter.model_name, duration)
+            model_inference_rows.labels(adapter.model_name).inc(len(inputs))
+
+    def queue_depth(self) -> int:
+        """Batches waiting for a free worker."""
+        if self._pool is None:
+            return 0
+        return max(0, self.in_flight - self._pool._max_workers)
+
+    def shutdown(self) -> None:
+        """Stop the worker pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+
+
+# Global executor instance
+inference_executor = InferenceExecutor(
+    kind=settings.INFERENCE_EXECUTOR, max_workers=settings.INFERENCE_MAX_WORKERS
+)
+
+scrape_gauge(
+    "inference_executor_in_flight",
+    "Model batches queued or running on the inference executor",
+    lambda: inference_executor.in_flight,
+)
+scrape_gauge(
+    "inference_executor_queue_depth",
+    "Model batches waiting for a free inference executor worker",
+    inference_executor.queue_depth,
+)
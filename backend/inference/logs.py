@@ -0,0 +1,163 @@
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+# Per-request logging context, set by RequestContextMiddleware
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_request_sampled: ContextVar[bool] = ContextVar("request_sampled", default=True)
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+REQUEST_ID_HEADER = "x-request-id"
+
+
+def request_sampled() -> bool:
+    """Whether per-request detail logs should be written for this request."""
+    return _request_sampled.get()
+
+
+def record_timing(name: str, seconds: float) -> None:
+    """Record a timing, in milliseconds, to be logged with the current request."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = round(seconds * 1000, 3)
+
+
+def request_timings() -> Dict[str, float]:
+    """Timings recorded so far for the current request."""
+    return dict(_request_timings.get() or {})
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Uses the field names Cloud Logging recognizes (``severity``, ``message``)
+    and merges any ``fields`` passed through ``extra`` into the record.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(
+                record.created, timezone.utc
+            ).isoformat(),
+            "severity": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+        entry.update(getattr(record, "fields", None) or {})
+        if record.exc_text or record.exc_info:
+            entry["exception"] = record.exc_text or self.formatException(
+                record.exc_info
+            )
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _ContextQueueHandler(QueueHandler):
+    """Queue handler that keeps structured fields for the listener to format."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Capture what depends on the calling thread or context now, and leave
+        # the JSON encoding and the write to the listener thread
+        record.request_id = _request_id.get()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configure_logging(level: str = "INFO") -> QueueListener:
+    """
+    Send every log record through a queue to a background writer thread.
+
+    Callers only pay for putting the record on an unbounded queue, so logging
+    never blocks the event loop on stdout. Returns the started listener,
+    which should be stopped on shutdown to flush pending records.
+    """
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_ContextQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def configure_worker_logging() -> None:
+    """
+    Write a forked worker's logs straight to stdout.
+
+    Workers inherit the parent's queue handler, but not the listener thread
+    that drains it, so anything they logged would never be written.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    for inherited in list(root.handlers):
+        root.removeHandler(inherited)
+    root.addHandler(handler)
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware giving each request an id, a sampling decision and timings.
+
+    The id comes from the ``X-Request-ID`` header when the caller sends one and
+    is echoed back on the response. Detail logs of a request are all kept or
+    all dropped, with probability ``sample_rate`` of being kept.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER.encode():
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+
+        async def send_with_request_id(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((REQUEST_ID_HEADER.encode(), request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        tokens = (
+            _request_id.set(request_id),
+            _request_sampled.set(random.random() < self.sample_rate),
+            _request_timings.set({}),
+        )
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_id.reset(tokens[0])
+            _request_sampled.reset(tokens[1])
+            _request_timings.reset(tokens[2])
@@ -0,0 +1,181 @@
+import os
+import time
+from typing import Callable, Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+
+# Request and model latencies are mostly well under a millisecond to a few
+# hundred milliseconds; downloads and model loads take seconds
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+LOAD_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route request counts, latency and concurrency."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            http_requests_in_flight.dec()
+
+            # Label by route template, never by raw path, to bound cardinality
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_request_duration.labels(scope["method"], path).observe(duration)
+            http_requests.labels(scope["method"], path, str(status)).inc()
+
+
+class _ScrapeGauge(Collector):
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+
+    def collect(self) -> Iterator[Metric]:
+        yield GaugeMetricFamily(self.name, self.documentation, value=self.function())
+
+
+def scrape_gauge(name: str, documentation: str, function: Callable[[], float]) -> None:
+    """
+    Expose a gauge read from ``function`` at scrape time.
+
+    Keeps the hot path free of any bookkeeping for values something else
+    already tracks, and unlike Gauge.set_function leaves nothing behind in
+    the multiprocess directory.
+    """
+    scrape_registry.register(_ScrapeGauge(name, documentation, function))
+
+
+def render() -> bytes:
+    """
+    Render the metrics in the Prometheus text exposition format.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set, every process writes its values
+    there and they're added up across the server's workers. Metrics read at
+    scrape time describe the process answering the scrape.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        aggregated = CollectorRegistry()
+        multiprocess.MultiProcessCollector(aggregated)
+    else:
+        aggregated = REGISTRY
+    return generate_latest(aggregated) + generate_latest(scrape_registry)
+
+
+# Metrics computed from the service's own state when scraped, with
+# scrape_gauge or a custom collector, rather than updated as things happen
+scrape_registry = CollectorRegistry()
+
+# Global metrics
+http_requests = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status",
+    ["method", "route", "status"],
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled",
+    multiprocess_mode="livesum",
+)
+
+model_inference_duration = Histogram(
+    "model_inference_duration_seconds",
+    "Time to score a batch with one model, including executor queueing "
+    "(but not worker pool queueing)",
+    ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+model_inference_rows = Counter(
+    "model_inference_rows_total", "Rows scored by each model", ["model"]
+)
+model_timeouts = Counter(
+    "model_timeouts_total",
+    "Model predictions left out of a /predict response for missing their deadline",
+    ["model"],
+)
+micro_batch_size = Histogram(
+    "inference_micro_batch_size",
+    "Predictions scored together per micro-batch of concurrent /predict calls",
+    buckets=BATCH_SIZE_BUCKETS,
+)
+
+model_cache_lookups = Counter(
+    "model_cache_lookups_total",
+    "Model lookups per cache tier (memory, disk, r2) and result (hit, miss)",
+    ["model", "tier", "result"],
+)
+model_load_duration = Histogram(
+    "model_load_duration_seconds",
+    "Time to load a model into memory, by source (disk, r2)",
+    ["model", "source"],
+    buckets=LOAD_BUCKETS,
+)
+model_unpickle_duration = Histogram(
+    "model_unpickle_duration_seconds",
+    "Time to unpickle a model file, or load a model artifact",
+    ["model"],
+    buckets=LOAD_BUCKETS,
+)
+r2_download_duration = Histogram(
+    "r2_download_duration_seconds",
+    "Time to download a model from R2",
+    ["model"],
+    buckets=LOAD_BUCKETS,
+)
+r2_download_bytes = Counter(
+    "r2_download_bytes_total", "Bytes of model files downloaded from R2", ["model"]
+)
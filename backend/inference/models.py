@@ -0,0 +1,666 @@
+import functools
+import inspect
+import itertools
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+
+from .schemas import IsapreEnum, TipoEnum
+
+ISAPRE_VALUES = [isapre.value for isapre in IsapreEnum]
+TIPO_VALUES = [tipo.value for tipo in TipoEnum]
+ISAPRE_INDEX = {value: index for index, value in enumerate(ISAPRE_VALUES)}
+TIPO_INDEX = {value: index for index, value in enumerate(TIPO_VALUES)}
+
+# Attribute names under which Bayesian network wrappers usually keep the
+# bin edges used to discretize ``total``
+TOTAL_EDGES_ATTRIBUTES = ("total_bins", "total_edges", "bins", "bin_edges", "edges")
+
+# Totals used to check compiled scorers against the original model
+PROBE_TOTALS = (1, 1_000, 58_000, 100_000, 2_500_000, 100_000_000)
+
+
+class LogisticScorer:
+    """
+    Logistic regression pipeline compiled to a few NumPy arrays.
+
+    The decision function of a fitted ``ColumnTransformer`` + ``LogisticRegression``
+    pipeline is an offset per (isapre, tipo) pair plus an affine function of
+    ``total``. Scoring is then one gather and one multiply-add per row, and the
+    predicted class comes from the same decision value as the probability.
+    """
+
+    def __init__(
+        self,
+        category_offsets: np.ndarray,
+        total_coef: float,
+        intercept: float,
+        classes: np.ndarray,
+    ):
+        self.category_offsets = category_offsets
+        self.total_coef = total_coef
+        self.intercept = intercept
+        self.classes = classes
+
+    def score(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return P(class 1) and the predicted class for each row."""
+        decision = (
+            self.category_offsets[isapre_idx, tipo_idx]
+            + self.total_coef * np.asarray(totals, dtype=np.float64)
+            + self.intercept
+        )
+        # Same rules as LogisticRegression.predict_proba and predict
+        return expit(decision), self.classes[(decision > 0).astype(int)]
+
+    def to_artifact(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Split the scorer into JSON parameters and arrays."""
+        return (
+            {"total_coef": float(self.total_coef), "intercept": float(self.intercept)},
+            {
+                "category_offsets": self.category_offsets,
+                # Object arrays would need pickle; class labels are plain values
+                "classes": np.asarray(self.classes.tolist()),
+            },
+        )
+
+    @classmethod
+    def from_artifact(
+        cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]
+    ) -> "LogisticScorer":
+        return cls(
+            arrays["category_offsets"],
+            params["total_coef"],
+            params["intercept"],
+            arrays["classes"],
+        )
+
+    @classmethod
+    def from_pipeline(cls, model: Any) -> Optional["LogisticScorer"]:
+        """
+        Compile a fitted sklearn pipeline, or return None if its structure
+        isn't recognized or the compiled scorer doesn't reproduce it.
+        """
+        try:
+            scorer = cls._extract(model)
+        except Exception:
+            return None
+        if scorer is None or not scorer._verify(model):
+            return None
+        return scorer
+
+    @classmethod
+    def _extract(cls, model: Any) -> Optional["LogisticScorer"]:
+        """Read the fitted encoders, scaler and coefficients."""
+        steps = getattr(model, "steps", None)
+        if not steps or len(steps) != 2:
+            return None
+        preprocessor, classifier = steps[0][1], steps[1][1]
+
+        coef = getattr(classifier, "coef_", None)
+        classes = getattr(classifier, "classes_", None)
+        if coef is None or classes is None or coef.shape[0] != 1 or len(classes) != 2:
+            return None
+        coef = coef[0]
+        output_indices = getattr(preprocessor, "output_indices_", None)
+        if output_indices is None:
+            return None
+
+        pairs = list(itertools.product(ISAPRE_VALUES, TIPO_VALUES))
+        category_offsets = np.zeros(len(pairs))
+        total_coef = 0.0
+        intercept = float(classifier.intercept_[0])
+
+        for name, transformer, columns in preprocessor.transformers_:
+            weights = coef[output_indices[name]]
+            if transformer == "drop" or len(weights) == 0:
+                continue
+            if isinstance(columns, str):
+                columns = [columns]
+            columns = list(columns)
+            # The remainder lists its columns by position
+            feature_names = getattr(preprocessor, "feature_names_in_", None)
+            if feature_names is not None:
+                columns = [
+                    feature_names[column] if isinstance(column, int) else column
+                    for column in columns
+                ]
+
+            if columns and set(columns) <= {"isapre", "tipo"}:
+                # Let the fitted encoder tell us what each category maps to
+                frame = pd.DataFrame(pairs, columns=["isapre", "tipo"])[columns]
+                encoded = transformer.transform(frame)
+                if hasattr(encoded, "toarray"):
+                    encoded = encoded.toarray()
+                category_offsets += np.asarray(encoded, dtype=np.float64) @ weights
+            elif columns == ["total"]:
+                slope, offset = _affine_parameters(transformer)
+                if slope is None:
+                    return None
+                total_coef += float(weights[0] * slope)
+                intercept += float(weights[0] * offset)
+            else:
+                return None
+
+        return cls(
+            category_offsets.reshape(len(ISAPRE_VALUES), len(TIPO_VALUES)),
+            total_coef,
+            intercept,
+            np.asarray(classes),
+        )
+
+    def _verify(self, model: Any) -> bool:
+        """Compare against the pipeline on every category and a few totals."""
+        rows = list(itertools.product(ISAPRE_VALUES, TIPO_VALUES, PROBE_TOTALS))
+        frame = pd.DataFrame(rows, columns=["isapre", "tipo", "total"])
+
+        probabilities, predicted_classes = self.score(
+            frame["isapre"].map(ISAPRE_INDEX).to_numpy(),
+            frame["tipo"].map(TIPO_INDEX).to_numpy(),
+            frame["total"].to_numpy(),
+        )
+        expected = model.predict_proba(frame)[:, 1]
+        if not np.allclose(probabilities, expected, rtol=1e-9, atol=1e-12):
+            return False
+        # Classes may only disagree where the probability is a hair from 0.5
+        undecided = np.abs(expected - 0.5) < 1e-9
+        return bool(np.all((predicted_classes == model.predict(frame)) | undecided))
+
+
+def _affine_parameters(transformer: Any) -> Tuple[Optional[float], float]:
+    """Return (slope, offset) of a fitted one-column scaler, if it is affine."""
+    if transformer == "passthrough":
+        return 1.0, 0.0
+
+    kind = type(transformer).__name__
+    if kind == "StandardScaler":
+        mean = transformer.mean_[0] if transformer.with_mean else 0.0
+        scale = transformer.scale_[0] if transformer.with_std else 1.0
+        return 1.0 / scale, -mean / scale
+    if kind == "MinMaxScaler":
+        return float(transformer.scale_[0]), float(transformer.min_[0])
+    if kind == "FunctionTransformer" and transformer.func is None:
+        return 1.0, 0.0
+
+    return None, 0.0
+
+
+class CompiledBayesianNetwork:
+    """
+    Dense lookup tables compiled from a discrete Bayesian network.
+
+    The network only depends on ``total`` through its bin, so evaluating
+    ``predict_all`` once per (isapre, tipo, total bin) gives every answer the
+    network can produce. Tables are indexed by (isapre, tipo, bin) in the
+    order of ``IsapreEnum`` and ``TipoEnum``.
+    """
+
+    def __init__(
+        self,
+        edges: np.ndarray,
+        right: bool,
+        probability: np.ndarray,
+        expected_amount: np.ndarray,
+        expected_days: np.ndarray,
+    ):
+        self.edges = edges
+        self.right = right
+        self.probability = probability
+        self.expected_amount = expected_amount
+        self.expected_days = expected_days
+
+    @property
+    def n_bins(self) -> int:
+        return len(self.edges) - 1
+
+    def bin_index(self, totals: np.ndarray) -> np.ndarray:
+        """Map totals to bin indices, using -1 for totals outside every bin."""
+        totals = np.asarray(totals, dtype=np.float64)
+        # Same convention as pd.cut: (a, b] when right-closed, [a, b) otherwise
+        side = "left" if self.right else "right"
+        bins = np.searchsorted(self.edges, totals, side=side) - 1
+        if self.right:
+            outside = totals <= self.edges[0]
+        else:
+            outside = totals >= self.edges[-1]
+        outside |= (bins < 0) | (bins >= self.n_bins)
+        return np.where(outside, -1, bins)
+
+    def lookup(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Answer many queries by array indexing.
+
+        Returns probability, expected amount and expected days, plus a mask of
+        the rows that were answered. Rows outside the compiled bins must be
+        answered by the network itself.
+        """
+        bins = self.bin_index(totals)
+        found = bins >= 0
+        bins = np.where(found, bins, 0)
+        found &= ~np.isnan(self.probability[isapre_idx, tipo_idx, bins])
+        return (
+            self.probability[isapre_idx, tipo_idx, bins],
+            self.expected_amount[isapre_idx, tipo_idx, bins],
+            self.expected_days[isapre_idx, tipo_idx, bins],
+            found,
+        )
+
+    def covers_all_totals(self) -> bool:
+        """Whether the tables answer every positive integer total by themselves."""
+        lowest = self.bin_index(np.array([1]))[0]
+        if lowest < 0 or not np.isposinf(self.edges[-1]):
+            return False
+        # Bins without integers inside are never looked up
+        for b, total in enumerate(_bin_totals(self.edges, self.right, first=True)):
+            if total is not None and np.isnan(self.probability[:, :, b]).any():
+                return False
+        return True
+
+    def to_artifact(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Split the tables into JSON parameters and arrays."""
+        return (
+            {"right": bool(self.right)},
+            {
+                "edges": self.edges,
+                "probability": self.probability,
+                "expected_amount": self.expected_amount,
+                "expected_days": self.expected_days,
+            },
+        )
+
+    @classmethod
+    def from_artifact(
+        cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]
+    ) -> "CompiledBayesianNetwork":
+        return cls(
+            arrays["edges"],
+            params["right"],
+            arrays["probability"],
+            arrays["expected_amount"],
+            arrays["expected_days"],
+        )
+
+    @classmethod
+    def compile(cls, model: Any) -> Optional["CompiledBayesianNetwork"]:
+        """
+        Compile ``model.predict_all`` into lookup tables.
+
+        Returns None when the bins of ``total`` can't be found on the model or
+        the compiled tables don't reproduce ``predict_all`` exactly.
+        """
+        edges, right = _find_total_edges(model)
+        if edges is None:
+            return None
+
+        sides = [right] if right is not None else [True, False]
+        for right in sides:
+            compiled = cls._evaluate(model, edges, right)
+            if compiled is not None and compiled._verify(model):
+                return compiled
+
+        return None
+
+    @classmethod
+    def _evaluate(
+        cls, model: Any, edges: np.ndarray, right: bool
+    ) -> Optional["CompiledBayesianNetwork"]:
+        """Run ``predict_all`` once per (isapre, tipo, bin)."""
+        shape = (len(ISAPRE_VALUES), len(TIPO_VALUES), len(edges) - 1)
+        tables = [np.full(shape, np.nan) for _ in range(3)]
+        representatives = _bin_totals(edges, right, first=not right)
+
+        for i, isapre in enumerate(ISAPRE_VALUES):
+            for t, tipo in enumerate(TIPO_VALUES):
+                for b, total in enumerate(representatives):
+                    if total is None:
+                        continue
+                    try:
+                        values = model.predict_all(isapre, tipo, total)
+                    except Exception:
+                        return None
+                    for table, value in zip(tables, values):
+                        table[i, t, b] = float(value)
+
+        return cls(edges, right, *tables)
+
+    def _verify(self, model: Any) -> bool:
+        """
+        Check the opposite end of every bin against ``predict_all``, for
+        every (isapre, tipo) pair.
+        """
+        checks = [
+            (b, total)
+            for b, total in enumerate(
+                _bin_totals(self.edges, self.right, first=self.right)
+            )
+            if total is not None
+        ]
+        # The totals checked must also land in the bins they're checked for
+        bins = self.bin_index(np.array([total for _, total in checks]))
+        if list(bins) != [b for b, _ in checks]:
+            return False
+
+        for i, isapre in enumerate(ISAPRE_VALUES):
+            for t, tipo in enumerate(TIPO_VALUES):
+                for b, total in checks:
+                    try:
+                        expected = model.predict_all(isapre, tipo, total)
+                    except Exception:
+                        return False
+
+                    actual = [
+                        self.probability[i, t, b],
+                        self.expected_amount[i, t, b],
+                        self.expected_days[i, t, b],
+                    ]
+                    if actual != [float(value) for value in expected]:
+                        return False
+
+        return True
+
+
+def _bin_totals(edges: np.ndarray, right: bool, first: bool) -> List[Optional[int]]:
+    """
+    Pick a positive integer total inside each bin.
+
+    ``first`` picks the smallest integer in the bin, otherwise the largest.
+    Bins with no positive integer inside get None.
+    """
+    totals: List[Optional[int]] = []
+    for low, high in zip(edges[:-1], edges[1:]):
+        # Integer range covered by the bin, honoring which side is closed
+        smallest = 1
+        if math.isfinite(low):
+            smallest = max(math.floor(low) + 1 if right else math.ceil(low), 1)
+        largest = smallest
+        if math.isfinite(high):
+            largest = math.floor(high) if right else math.ceil(high) - 1
+        if largest < smallest:
+            totals.append(None)
+        else:
+            totals.append(int(smallest if first else largest))
+    return totals
+
+
+def _find_total_edges(model: Any) -> Tuple[Optional[np.ndarray], Optional[bool]]:
+    """
+    Find the bin edges used to discretize ``total``.
+
+    Looks for an explicit edges attribute first, then for pgmpy state names
+    stored as ``pd.Interval`` objects. Returns the edges and, when known,
+    whether bins are right-closed.
+    """
+    for attribute in TOTAL_EDGES_ATTRIBUTES:
+        edges = getattr(model, attribute, None)
+        if isinstance(edges, dict):
+            edges = edges.get("total")
+        edges = _as_edges(edges)
+        if edges is not None:
+            right = getattr(model, "right", None)
+            return edges, right if isinstance(right, bool) else None
+
+    network = model if hasattr(model, "get_cpds") else getattr(model, "model", None)
+    if network is not None and hasattr(network, "get_cpds"):
+        for cpd in network.get_cpds():
+            states = cpd.state_names.get("total")
+            if states and all(isinstance(state, pd.Interval) for state in states):
+                intervals = sorted(states, key=lambda interval: interval.left)
+                edges = _as_edges(
+                    [intervals[0].left] + [interval.right for interval in intervals]
+                )
+                if edges is not None:
+                    return edges, intervals[0].closed == "right"
+
+    return None, None
+
+
+def _as_edges(value: Any) -> Optional[np.ndarray]:
+    """Return ``value`` as an increasing float array of edges, if it is one."""
+    if value is None or isinstance(value, (str, bytes, dict)):
+        return None
+    try:
+        edges = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if edges.ndim != 1 or len(edges) < 2 or np.isnan(edges).any():
+        return None
+    if not np.all(np.diff(edges) > 0):
+        return None
+    return edges
+
+
+# Features the GMM scorer knows how to build from a request
+GMM_FEATURES = {
+    "total": lambda totals: totals,
+    "total_log": np.log1p,
+}
+
+
+class GMMScorer:
+    """
+    Vectorized version of the GMM row-probability callable.
+
+    The callable compares class-conditional Gaussian mixtures for approved and
+    denied claims, conditioned on the claim's (isapre, tipo). Here both
+    mixtures are evaluated for a whole batch at once, one einsum over all
+    components, and the per-category conditioning is a precomputed offset
+    table read back from the callable itself.
+    """
+
+    def __init__(
+        self,
+        features: List[str],
+        mixtures: List[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+        category_offsets: np.ndarray,
+    ):
+        # mixtures holds (log weights, means, full precision Cholesky factors)
+        # for the denied and the approved class, in that order
+        self.features = features
+        self.mixtures = mixtures
+        self.category_offsets = category_offsets
+
+    def log_likelihood_ratio(self, totals: np.ndarray) -> np.ndarray:
+        """log p(x | approved) - log p(x | denied) for each total."""
+        totals = np.asarray(totals, dtype=np.float64)
+        X = np.column_stack([GMM_FEATURES[name](totals) for name in self.features])
+        denied, approved = (
+            _mixture_log_density(X, *mixture) for mixture in self.mixtures
+        )
+        return approved - denied
+
+    def score(
+        self, isapre_idx: np.ndarray, tipo_idx: np.ndarray, totals: np.ndarray
+    ) -> np.ndarray:
+        """Return P(approved) for each row."""
+        log_approved = (
+            self.log_likelihood_ratio(totals)
+            + self.category_offsets[isapre_idx, tipo_idx]
+        )
+        # P(approved) = e^a / (e^a + e^0), through log-sum-exp for stability
+        return np.exp(log_approved - np.logaddexp(log_approved, 0.0))
+
+    def to_artifact(self) -> Tuple[Dict[str, Any], Dict[str, np.ndarray]]:
+        """Split the scorer into JSON parameters and arrays."""
+        arrays = {"category_offsets": self.category_offsets}
+        for label, mixture in zip(("denied", "approved"), self.mixtures):
+            log_weights, means, precisions = mixture
+            arrays[f"{label}_log_weights"] = log_weights
+            arrays[f"{label}_means"] = means
+            arrays[f"{label}_precisions"] = precisions
+        return {"features": list(self.features)}, arrays
+
+    @classmethod
+    def from_artifact(
+        cls, params: Dict[str, Any], arrays: Dict[str, np.ndarray]
+    ) -> "GMMScorer":
+        mixtures = [
+            (
+                arrays[f"{label}_log_weights"],
+                arrays[f"{label}_means"],
+                arrays[f"{label}_precisions"],
+            )
+            for label in ("denied", "approved")
+        ]
+        return cls(params["features"], mixtures, arrays["category_offsets"])
+
+    @classmethod
+    def from_callable(cls, model: Any) -> Optional["GMMScorer"]:
+        """
+        Compile the row callable, or return None if it isn't built from two
+        class-conditional mixtures or the scorer doesn't reproduce it.
+        """
+        try:
+            mixtures = _find_mixtures(model)
+            if len(mixtures) != 2:
+                return None
+            features = _mixture_features(mixtures)
+            if features is None:
+                return None
+
+            # Which mixture is the approved one is settled by verification
+            for denied, approved in (mixtures, mixtures[::-1]):
+                scorer = cls(
+                    features,
+                    [_mixture_parameters(denied), _mixture_parameters(approved)],
+                    np.zeros((len(ISAPRE_VALUES), len(TIPO_VALUES))),
+                )
+                if scorer._calibrate(model) and scorer._verify(model):
+                    return scorer
+        except Exception:
+            return None
+
+        return None
+
+    def _calibrate(self, model: Any) -> bool:
+        """Read each category's offset off one call to the callable."""
+        for i, isapre in enumerate(ISAPRE_VALUES):
+            for t, tipo in enumerate(TIPO_VALUES):
+                for total in sorted(PROBE_TOTALS, key=lambda x: abs(x - 58_000)):
+                    probability = _call_row_model(model, isapre, tipo, total)
+                    if 1e-9 < probability < 1 - 1e-9:
+                        break
+                else:
+                    return False
+                ratio = self.log_likelihood_ratio(np.array([total]))[0]
+                self.category_offsets[i, t] = (
+                    np.log(probability) - np.log1p(-probability) - ratio
+                )
+        return True
+
+    def _verify(self, model: Any) -> bool:
+        """Compare against the callable on every category and a few totals."""
+        for i, isapre in enumerate(ISAPRE_VALUES):
+            for t, tipo in enumerate(TIPO_VALUES):
+                totals = np.array(PROBE_TOTALS)
+                expected = [
+                    _call_row_model(model, isapre, tipo, total) for total in totals
+                ]
+                probabilities = self.score(
+                    np.full(len(totals), i), np.full(len(totals), t), totals
+                )
+                if not np.allclose(probabilities, expected, rtol=1e-7, atol=1e-9):
+                    return False
+        return True
+
+
+def _call_row_model(model: Any, isapre: str, tipo: str, total: int) -> float:
+    """Call the GMM row callable the same way GMMAdapter does."""
+    row = pd.Series(
+        {"isapre": isapre, "tipo": tipo, "total": total, "total_log": np.log1p(total)}
+    )
+    return float(model(row))
+
+
+def _mixture_log_density(
+    X: np.ndarray, log_weights: np.ndarray, means: np.ndarray, precisions: np.ndarray
+) -> np.ndarray:
+    """Log-density of a Gaussian mixture at every row of X."""
+    n_features = X.shape[1]
+    # (x - mu_k) L_k for every row and component in a single einsum
+    y = np.einsum("nd,kde->nke", X, precisions) - np.einsum(
+        "kd,kde->ke", means, precisions
+    )
+    log_det = np.log(np.diagonal(precisions, axis1=1, axis2=2)).sum(axis=1)
+    log_prob = (
+        -0.5 * (n_features * np.log(2 * np.pi) + np.sum(y**2, axis=2))
+        + log_det
+        + log_weights
+    )
+    # log-sum-exp over components
+    peak = log_prob.max(axis=1, keepdims=True)
+    return (peak + np.log(np.exp(log_prob - peak).sum(axis=1, keepdims=True)))[:, 0]
+
+
+def _mixture_parameters(mixture: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Convert a fitted sklearn mixture to (log weights, means, full precisions)."""
+    means = np.asarray(mixture.means_, dtype=np.float64)
+    n_components, n_features = means.shape
+    precisions = np.asarray(mixture.precisions_cholesky_, dtype=np.float64)
+
+    if mixture.covariance_type == "tied":
+        precisions = np.broadcast_to(precisions, (n_components, n_features, n_features))
+    elif mixture.covariance_type == "diag":
+        precisions = np.stack([np.diag(p) for p in precisions])
+    elif mixture.covariance_type == "spherical":
+        precisions = np.stack([np.eye(n_features) * p for p in precisions])
+
+    return np.log(mixture.weights_), means, np.ascontiguousarray(precisions)
+
+
+def _mixture_features(mixtures: List[Any]) -> Optional[List[str]]:
+    """Names of the request features the mixtures were fitted on."""
+    features = []
+    for mixture in mixtures:
+        names = getattr(mixture, "feature_names_in_", None)
+        if names is None:
+            # Fitted on a bare array: only the log total is unambiguous
+            names = ["total_log"] if mixture.means_.shape[1] == 1 else None
+        if names is None or not set(names) <= set(GMM_FEATURES):
+            return None
+        features.append(list(names))
+
+    return features[0] if features[0] == features[1] else None
+
+
+def _find_mixtures(model: Any) -> List[Any]:
+    """Find the fitted Gaussian mixtures a row callable closes over."""
+    if inspect.isfunction(model):
+        closure = inspect.getclosurevars(model)
+        values = list(closure.nonlocals.values()) + list(closure.globals.values())
+    elif isinstance(model, functools.partial):
+        values = list(model.args) + list(model.keywords.values())
+    else:
+        values = list(getattr(model, "__dict__", {}).values())
+
+    mixtures: List[Any] = []
+    for value in values:
+        if isinstance(value, dict):
+            candidates = list(value.values())
+        elif isinstance(value, (list, tuple)):
+            candidates = list(value)
+        else:
+            candidates = [value]
+        for candidate in candidates:
+            if _is_mixture(candidate) and all(candidate is not m for m in mixtures):
+                mixtures.append(candidate)
+
+    return mixtures
+
+
+def _is_mixture(value: Any) -> bool:
+    """Whether ``value`` looks like a fitted sklearn GaussianMixture."""
+    return all(
+        hasattr(value, attribute)
+        for attribute in (
+            "weights_",
+            "means_",
+            "precisions_cholesky_",
+            "covariance_type",
+        )
+    )
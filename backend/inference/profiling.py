@@ -0,0 +1,293 @@
+import hmac
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from types import CodeType, FrameType
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from .config import settings
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+
+# Requests that can be profiled
+PROFILED_PATHS = ("/predict", "/predict/batch")
+
+# Call tree nodes with fewer samples than this fraction of the total are dropped
+_MIN_NODE_FRACTION = 0.005
+
+_active_profile: ContextVar[Optional["Profile"]] = ContextVar(
+    "active_profile", default=None
+)
+_current_phase: ContextVar[Optional["_Phase"]] = ContextVar(
+    "current_phase", default=None
+)
+_null_phase = nullcontext()
+
+
+class Profile:
+    """Samples and phase timings collected while profiling one request."""
+
+    def __init__(self, path: str, interval: float):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        # Threads doing work for this request, sampled by the profiler thread:
+        # the event loop throughout, executor threads while in a phase
+        self.loop_thread = threading.get_ident()
+        self.threads = {self.loop_thread}
+        self.stacks: Counter = Counter()
+        self.phases: Dict[Tuple[str, Optional[str]], float] = {}
+        self._lock = threading.Lock()
+
+    def add_phase(self, name: str, model: Optional[str], seconds: float) -> None:
+        with self._lock:
+            key = (name, model)
+            self.phases[key] = self.phases.get(key, 0.0) + seconds
+
+    def add_sample(self, thread_name: str, frame: FrameType) -> None:
+        stack = []
+        while frame is not None:
+            stack.append(_location(frame.f_code))
+            frame = frame.f_back
+        stack.append(thread_name)
+        self.stacks[tuple(reversed(stack))] += 1
+
+    def report(self) -> Dict[str, Any]:
+        """Phase breakdown and sampled call tree, in milliseconds."""
+        phases: Dict[str, float] = {}
+        models: Dict[str, Dict[str, float]] = {}
+        for (name, model), seconds in sorted(self.phases.items(), key=str):
+            phases[name] = phases.get(name, 0.0) + seconds * 1000
+            if model is not None:
+                models.setdefault(model, {})[name] = round(seconds * 1000, 3)
+
+        samples = sum(self.stacks.values())
+        return {
+            "id": self.id,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": samples,
+            "phases_ms": {name: round(ms, 3) for name, ms in phases.items()},
+            "models_ms": models,
+            "top_functions": _top_functions(self.stacks),
+            "call_tree": _call_tree(self.stacks, samples),
+            "folded_stacks": [
+                f"{';'.join(stack)} {count}"
+                for stack, count in self.stacks.most_common()
+            ],
+        }
+
+
+class _Phase:
+    """Times a block, excluding time spent in phases nested inside it."""
+
+    def __init__(self, profile: Profile, name: str, model: Optional[str]):
+        self.profile = profile
+        self.name = name
+        self.model = model
+        self.nested = 0.0
+
+    def __enter__(self) -> "_Phase":
+        self.profile.threads.add(threading.get_ident())
+        self.parent = _current_phase.get()
+        self.token = _current_phase.set(self)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        elapsed = time.perf_counter() - self.started
+        _current_phase.reset(self.token)
+        if self.parent is not None:
+            self.parent.nested += elapsed
+        elif threading.get_ident() != self.profile.loop_thread:
+            self.profile.threads.discard(threading.get_ident())
+        self.profile.add_phase(self.name, self.model, elapsed - self.nested)
+
+
+def active() -> bool:
+    """Whether the current request is being profiled."""
+    return _active_profile.get() is not None
+
+
+def phase(name: str, model: Optional[str] = None):
+    """Context manager timing a phase of the request being profiled, if any."""
+    profile = _active_profile.get()
+    if profile is None:
+        return _null_phase
+    return _Phase(profile, name, model)
+
+
+def record_elapsed(name: str) -> None:
+    """Record the time since the profiled request started as a phase."""
+    profile = _active_profile.get()
+    if profile is not None:
+        profile.add_phase(name, None, time.perf_counter() - profile.started)
+
+
+class _Sampler(threading.Thread):
+    """Thread recording the stacks of a profile's threads at a fixed interval."""
+
+    def __init__(self, profile: Profile):
+        super().__init__(name="profiler", daemon=True)
+        self.profile = profile
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.profile.interval):
+            frames = sys._current_frames()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id in list(self.profile.threads):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    self.profile.add_sample(names.get(thread_id, "?"), frame)
+
+
+class ProfileStore:
+    """The most recent profile reports, kept in memory."""
+
+    def __init__(self, max_reports: int):
+        self._reports: Deque[Dict[str, Any]] = deque(maxlen=max(max_reports, 1))
+
+    def add(self, report: Dict[str, Any]) -> None:
+        self._reports.append(report)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        for report in self._reports:
+            if report["id"] == profile_id:
+                return report
+        return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summaries of the stored reports, newest first."""
+        return [
+            {
+                key: report[key]
+                for key in ("id", "path", "started_at", "duration_ms", "phases_ms")
+            }
+            for report in reversed(self._reports)
+        ]
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware running selected requests under a sampling profiler.
+
+    A request to one of ``PROFILED_PATHS`` is profiled when it sends ``token``
+    in the ``X-Profile`` header, or at random with probability
+    ``sample_rate``. Only one request is profiled at a time. Its report is
+    kept in ``store`` and its id returned in the ``X-Profile-ID`` header.
+    """
+
+    def __init__(
+        self,
+        app,
+        store: ProfileStore,
+        token: Optional[str] = None,
+        sample_rate: float = 0.0,
+        interval: float = 0.001,
+    ):
+        self.app = app
+        self.store = store
+        self.token = token
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self._busy = threading.Lock()
+
+    def _requested(self, scope) -> bool:
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            return False
+        if self.token is not None:
+            for name, value in scope["headers"]:
+                if name == PROFILE_HEADER.encode():
+                    return hmac.compare_digest(value, self.token.encode())
+        return random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send) -> None:
+        if not self._requested(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["path"], self.interval)
+
+        async def send_with_profile_id(message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((PROFILE_ID_HEADER.encode(), profile.id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        sampler = _Sampler(profile)
+        token = _active_profile.set(profile)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stopped.set()
+            sampler.join()
+            _active_profile.reset(token)
+            profile.duration = time.perf_counter() - profile.started
+            self.store.add(profile.report())
+            self._busy.release()
+
+
+def _location(code: CodeType) -> str:
+    filename = code.co_filename
+    for marker in ("site-packages" + os.sep, os.getcwd() + os.sep):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _top_functions(stacks: Counter, limit: int = 30) -> List[Dict[str, Any]]:
+    """Functions by samples spent in them (self) and under them (total)."""
+    own: Counter = Counter()
+    total: Counter = Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for function in set(stack[1:]):
+            total[function] += count
+    return [
+        {"function": function, "self": own[function], "total": total[function]}
+        for function, _ in own.most_common(limit)
+    ]
+
+
+def _call_tree(stacks: Counter, samples: int) -> List[Dict[str, Any]]:
+    """Merge sampled stacks into a tree, one root per thread."""
+    root: Dict[str, Any] = {"children": {}}
+    for stack, count in stacks.items():
+        node = root
+        for function in stack:
+            node = node["children"].setdefault(
+                function, {"function": function, "samples": 0, "children": {}}
+            )
+            node["samples"] += count
+
+    min_samples = max(1, samples * _MIN_NODE_FRACTION)
+
+    def prune(children: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {**node, "children": prune(node["children"])}
+            for node in sorted(children.values(), key=lambda n: -n["samples"])
+            if node["samples"] >= min_samples
+        ]
+
+    return prune(root["children"])
+
+
+# Global store of profile reports
+profile_store = ProfileStore(settings.PROFILING_MAX_REPORTS)
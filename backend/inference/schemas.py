@@ -1,5 +1,6 @@
 from enum import Enum
-from pydantic import BaseModel, Field
+from typing import Any, List, Literal, Optional, Union
+from pydantic import BaseModel, Field, model_serializer
 
 
 class IsapreEnum(str, Enum):
@@ -74,7 +75,105 @@ class GMMResponse(BaseModel):
     probability: float = Field(ge=0, le=1, description="Probability of approval")
 
 
+# Response sections, one per model, that callers can ask for
+ModelSection = Literal["logistic_regression", "bayesian_network", "gmm"]
+MODEL_SECTIONS: List[ModelSection] = ["logistic_regression", "bayesian_network", "gmm"]
+
+
 class PredictionResponse(BaseModel):
-    logistic_regression: LogisticRegressionResponse
-    bayesian_network: BayesianNetworkResponse
-    gmm: GMMResponse
+    # Sections are missing for models that weren't requested or timed out
+    logistic_regression: Optional[LogisticRegressionResponse] = None
+    bayesian_network: Optional[BayesianNetworkResponse] = None
+    gmm: Optional[GMMResponse] = None
+    timed_out: Optional[List[ModelSection]] = Field(
+        None, description="Requested models that missed their deadline"
+    )
+
+    @model_serializer(mode="wrap")
+    def _omit_missing(self, handler):
+        # Leave missing sections out entirely rather than sending nulls
+        return {key: value for key, value in handler(self).items() if value is not None}
+
+
+# Batch API schemas
+MAX_BATCH_SIZE = 10_000
+
+
+class BatchPredictionRequest(BaseModel):
+    # Items are validated one by one so a bad item doesn't fail the whole batch
+    items: List[Any] = Field(
+        min_length=1,
+        max_length=MAX_BATCH_SIZE,
+        description="Inputs with the same fields as InferenceInput",
+    )
+
+
+class BatchItemError(BaseModel):
+    loc: List[Union[str, int]] = Field(description="Location of the invalid field")
+    msg: str = Field(description="Validation error message")
+    type: str = Field(description="Validation error type")
+
+
+class BatchPredictionItem(BaseModel):
+    index: int = Field(description="Position of the item in the request")
+    prediction: Optional[PredictionResponse] = None
+    errors: Optional[List[BatchItemError]] = None
+
+
+class BatchPredictionResponse(BaseModel):
+    results: List[BatchPredictionItem]
+    succeeded: int = Field(description="Number of items scored successfully")
+    failed: int = Field(description="Number of items that failed validation")
+
+
+# Curve API schemas
+MAX_CURVE_POINTS = 1_000
+
+
+class LogisticRegressionCurve(BaseModel):
+    probability: List[float]
+    chosen_class: List[bool]
+
+
+class BayesianNetworkCurve(BaseModel):
+    probability: List[float]
+    expected_reimbursement: List[int]
+    expected_wait: List[int]
+
+
+class GMMCurve(BaseModel):
+    probability: List[float]
+
+
+class CurveResponse(BaseModel):
+    isapre: IsapreEnum
+    tipo: TipoEnum
+    total: List[int] = Field(description="Totals in CLP, one per point")
+    logistic_regression: LogisticRegressionCurve
+    bayesian_network: BayesianNetworkCurve
+    gmm: GMMCurve
+
+
+# Matrix API schemas
+class LogisticRegressionMatrix(BaseModel):
+    probability: List[List[float]]
+    chosen_class: List[List[bool]]
+
+
+class BayesianNetworkMatrix(BaseModel):
+    probability: List[List[float]]
+    expected_reimbursement: List[List[int]]
+    expected_wait: List[List[int]]
+
+
+class GMMMatrix(BaseModel):
+    probability: List[List[float]]
+
+
+class MatrixResponse(BaseModel):
+    total: int
+    isapre: List[IsapreEnum] = Field(description="Row labels")
+    tipo: List[TipoEnum] = Field(description="Column labels")
+    logistic_regression: LogisticRegressionMatrix
+    bayesian_network: BayesianNetworkMatrix
+    gmm: GMMMatrix
@@ -1,9 +1,37 @@
 import asyncio
-from typing import Dict, Any
+import functools
+import hashlib
+import importlib
+import json
+import logging
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Dict,
+    Any,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 from fastapi import HTTPException
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.registry import Collector
+from pydantic import ValidationError
 
+from .batching import MicroBatcher
 from .cache import model_cache
-from .adapters import ModelAdapterFactory, ModelAdapter
+from .config import settings
+from .executor import inference_executor
+from .metrics import model_timeouts, scrape_gauge, scrape_registry
+from .prediction_cache import PredictionCache
+from .profiling import active as profiling_active, phase
+from .singleflight import SingleFlight
+from .startup import startup_timer
+from .streaming import Record, iter_chunks
+from .workers import InferenceWorkerPool
 from .schemas import (
     InferenceInput,
     ModelPrediction,
@@ -15,8 +43,33 @@ from .schemas import (
     LogisticRegressionResponse,
     BayesianNetworkResponse,
     GMMResponse,
+    BatchItemError,
+    BatchPredictionItem,
+    BatchPredictionResponse,
+    CurveResponse,
+    LogisticRegressionCurve,
+    BayesianNetworkCurve,
+    GMMCurve,
+    MatrixResponse,
+    ModelSection,
+    MODEL_SECTIONS,
+    LogisticRegressionMatrix,
+    BayesianNetworkMatrix,
+    GMMMatrix,
 )
 
+if TYPE_CHECKING:
+    from .adapters import ModelAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class ScoredPrediction(NamedTuple):
+    """A response and the fingerprints of the models that made it, by section."""
+
+    response: PredictionResponse
+    fingerprints: Dict[str, Optional[str]]
+
 
 class InferenceService:
     """Service for machine learning inference operations."""
@@ -27,10 +80,40 @@ class InferenceService:
         "gmm": "gmm",
     }
 
-    def __init__(self):
-        self._adapters: Dict[str, ModelAdapter] = {}
+    # Input used to exercise every model once before serving traffic
+    WARMUP_INPUT = InferenceInput(
+        isapre=IsapreEnum.FONASA, tipo=TipoEnum.HORA_MEDICA, total=100_000
+    )
+
+    def __init__(
+        self,
+        worker_processes: int = 0,
+        prediction_cache_size: int = 0,
+        prediction_cache_ttl: float = 0,
+        total_bucket: int = 0,
+        micro_batch_size: int = 0,
+        micro_batch_wait: float = 0,
+        micro_batch_in_flight: int = 1,
+    ):
+        self._adapters: Dict[str, "ModelAdapter"] = {}
+        self._prediction_cache = PredictionCache(
+            prediction_cache_size, prediction_cache_ttl
+        )
+        self.total_bucket = total_bucket
+        self._adapter_loads = SingleFlight()
+        self.ready = False
+        self.warmup_error: Optional[str] = None
+        self._worker_pool: Optional[InferenceWorkerPool] = None
+        self._worker_pool_lock = asyncio.Lock()
+        if worker_processes > 0:
+            self._worker_pool = InferenceWorkerPool(worker_processes)
+        self.micro_batch_size = micro_batch_size
+        self.micro_batch_wait = micro_batch_wait
+        self.micro_batch_in_flight = micro_batch_in_flight
+        # One batcher per set of sections requested together
+        self._micro_batchers: Dict[Tuple[ModelSection, ...], MicroBatcher] = {}
 
-    async def _get_adapter(self, model_name: str) -> ModelAdapter:
+    async def _get_adapter(self, model_name: str) -> "ModelAdapter":
         """Get or create model adapter."""
         if model_name not in self._adapters:
             if model_name not in self.MODEL_NAMES:
@@ -38,15 +121,45 @@ class InferenceService:
                     status_code=400, detail=f"Unknown model: {model_name}"
                 )
 
-            # Load model from cache
-            model = await model_cache.get_model(self.MODEL_NAMES[model_name])
-
-            # Create adapter
-            adapter = ModelAdapterFactory.create_adapter(model_name, model)
-            self._adapters[model_name] = adapter
+            # Concurrent callers share a single adapter creation
+            return await self._adapter_loads.do(
+                model_name, lambda: self._create_adapter(model_name)
+            )
 
         return self._adapters[model_name]
 
+    async def _create_adapter(self, model_name: str) -> "ModelAdapter":
+        """Load a model and build its adapter."""
+        # Load model from cache
+        cache_name = self.MODEL_NAMES[model_name]
+        with startup_timer.measure(f"load_{model_name}"):
+            model = await model_cache.get_model(cache_name)
+        version = model_cache.get_version(cache_name)
+        fingerprint = model_cache.get_fingerprint(cache_name)
+
+        # Create adapter off the event loop, as it may compile the model
+        with startup_timer.measure(f"adapter_{model_name}"):
+            adapter = await asyncio.get_running_loop().run_in_executor(
+                None, _create_adapter, model_name, model
+            )
+        adapter.version = version
+        adapter.fingerprint = fingerprint
+        inference_executor.register_adapter(adapter)
+        self._adapters[model_name] = adapter
+        return adapter
+
+    async def _get_worker_pool(self) -> InferenceWorkerPool:
+        """Get the worker pool, loading all models and forking it if needed."""
+        assert self._worker_pool is not None
+        if not self._worker_pool.started:
+            async with self._worker_pool_lock:
+                if not self._worker_pool.started:
+                    adapters = await asyncio.gather(
+                        *(self._get_adapter(name) for name in self.MODEL_NAMES)
+                    )
+                    await self._worker_pool.start(dict(zip(self.MODEL_NAMES, adapters)))
+        return self._worker_pool
+
     async def predict_logistic_regression(
         self, input_data: InferenceInput
     ) -> ModelPrediction:
@@ -70,25 +183,404 @@ class InferenceService:
         self, input_data: InferenceInput
     ) -> PredictionResponse:
         """Run prediction on all models and return formatted response."""
-        # Run all predictions concurrently
-        lr_result, bn_result, gmm_result = await asyncio.gather(
-            self.predict_logistic_regression(input_data),
-            self.predict_bayesian_network(input_data),
-            self.predict_gmm(input_data),
-        )
-
-        # Format responses according to API specification
-        return PredictionResponse(
-            logistic_regression=LogisticRegressionResponse(
-                probability=lr_result.probability,
-                chosen_class=bool(lr_result.predicted_class),
+        return await self.predict_models(input_data, MODEL_SECTIONS)
+
+    async def predict_models_tagged(
+        self,
+        input_data: InferenceInput,
+        sections: Sequence[ModelSection] = MODEL_SECTIONS,
+        timeout: Optional[float] = None,
+    ) -> Tuple[PredictionResponse, Optional[str]]:
+        """
+        Run the requested models like ``predict_models``, returning the
+        response with its HTTP entity tag, derived from the models that
+        actually answered. Only complete responses get a tag.
+        """
+        scored = await self._predict(input_data, sections, timeout)
+        if len(sections) < len(MODEL_SECTIONS):
+            return scored.response, None
+        return scored.response, self.prediction_etag(input_data, scored.fingerprints)
+
+    async def predict_models(
+        self,
+        input_data: InferenceInput,
+        sections: Sequence[ModelSection],
+        timeout: Optional[float] = None,
+    ) -> PredictionResponse:
+        """
+        Run only the requested models, each within its own deadline.
+
+        Models that miss the deadline are left out of the response and listed
+        in ``timed_out`` instead of holding up the others. Without the worker
+        pool, models that weren't requested are never loaded for this request.
+        """
+        return (await self._predict(input_data, sections, timeout)).response
+
+    async def _predict(
+        self,
+        input_data: InferenceInput,
+        sections: Sequence[ModelSection],
+        timeout: Optional[float] = None,
+    ) -> ScoredPrediction:
+        """Predict through the prediction cache, see ``predict_models``."""
+        # Profiled requests always run the models, to show where time goes
+        use_cache = self._prediction_cache.enabled and not profiling_active()
+        if use_cache:
+            fingerprints = self._serving_fingerprints()
+            cached = self._cached_response(input_data, fingerprints)
+            if cached is not None:
+                if len(sections) < len(MODEL_SECTIONS):
+                    cached = cached.model_copy(
+                        update={s: None for s in MODEL_SECTIONS if s not in sections}
+                    )
+                return ScoredPrediction(cached, fingerprints)
+
+        if timeout is None:
+            scored = await self._predict_sections(input_data, sections)
+        else:
+            scored = await self._predict_sections_within(input_data, sections, timeout)
+
+        if use_cache:
+            self._cache_response(input_data, scored)
+        return scored
+
+    async def _predict_sections(
+        self, input_data: InferenceInput, sections: Sequence[ModelSection]
+    ) -> ScoredPrediction:
+        """Score one input with the given sections' models, bypassing the cache."""
+        # Profiled requests run on their own, so phases are theirs alone
+        if self.micro_batch_size > 0 and not profiling_active():
+            return await self._get_micro_batcher(sections).predict(input_data)
+        return (await self._score_batch([input_data], sections))[0]
+
+    async def _predict_sections_within(
+        self,
+        input_data: InferenceInput,
+        sections: Sequence[ModelSection],
+        timeout: float,
+    ) -> ScoredPrediction:
+        """Score one input with each section's model under its own deadline."""
+        outcomes = await asyncio.gather(
+            *(
+                asyncio.wait_for(self._predict_sections(input_data, [section]), timeout)
+                for section in sections
+            ),
+            return_exceptions=True,
+        )
+
+        results = {}
+        fingerprints = {}
+        timed_out = []
+        for section, outcome in zip(sections, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                timed_out.append(section)
+                model_timeouts.labels(section).inc()
+            elif isinstance(outcome, BaseException):
+                raise outcome
+            else:
+                results[section] = getattr(outcome.response, section)
+                fingerprints.update(outcome.fingerprints)
+
+        return ScoredPrediction(
+            PredictionResponse(**results, timed_out=timed_out or None), fingerprints
+        )
+
+    def _get_micro_batcher(self, sections: Sequence[ModelSection]) -> MicroBatcher:
+        """Get the micro-batcher for a set of sections, creating it if needed."""
+        key = tuple(section for section in MODEL_SECTIONS if section in sections)
+        if key not in self._micro_batchers:
+            self._micro_batchers[key] = MicroBatcher(
+                functools.partial(self._score_batch, sections=key),
+                self.micro_batch_size,
+                self.micro_batch_wait,
+                self.micro_batch_in_flight,
+            )
+        return self._micro_batchers[key]
+
+    def _cache_total(self, total: int) -> int:
+        """
+        Total a response is cached and tagged under, rounded to the
+        configured bucket, if any.
+
+        Only the key is rounded: inputs are always scored with their own
+        total, and a cached response may have been scored for another total
+        in the same bucket.
+        """
+        if self.total_bucket <= 0:
+            return total
+        return max(
+            round(total / self.total_bucket) * self.total_bucket, self.total_bucket
+        )
+
+    def _cached_response(
+        self, input_data: InferenceInput, fingerprints: Dict[str, Optional[str]]
+    ) -> Optional[PredictionResponse]:
+        """Cached full response for an input, if made by the given models."""
+        key = self._prediction_cache_key(input_data, fingerprints)
+        return self._prediction_cache.get(key) if key is not None else None
+
+    def _cache_response(
+        self, input_data: InferenceInput, scored: ScoredPrediction
+    ) -> None:
+        """Cache a full response under the models that made it."""
+        # If a model was reloaded while scoring, lookups never match this key
+        key = self._prediction_cache_key(input_data, scored.fingerprints)
+        if key is not None:
+            self._prediction_cache.put(key, scored.response)
+
+    def _prediction_cache_key(
+        self, input_data: InferenceInput, fingerprints: Dict[str, Optional[str]]
+    ) -> Optional[tuple]:
+        """
+        Key of an input's full response made by the given models.
+
+        Returns None unless there's a fingerprint for every section.
+        """
+        if any(section not in fingerprints for section in MODEL_SECTIONS):
+            return None
+        return (
+            input_data.isapre,
+            input_data.tipo,
+            self._cache_total(input_data.total),
+            tuple(fingerprints[section] for section in MODEL_SECTIONS),
+        )
+
+    def _serving_fingerprints(self) -> Dict[str, Optional[str]]:
+        """Fingerprints of the models new requests are scored with, by section."""
+        adapters = (
+            self._worker_pool.adapters
+            if self._worker_pool is not None
+            else self._adapters
+        )
+        return {
+            section: adapters[model_name].fingerprint
+            for section, model_name in SECTION_MODELS.items()
+            if model_name in adapters
+        }
+
+    def prediction_etag(
+        self,
+        input_data: InferenceInput,
+        fingerprints: Optional[Dict[str, Optional[str]]] = None,
+    ) -> Optional[str]:
+        """
+        HTTP entity tag of an input's full prediction.
+
+        Predictions only change with the input and the models, so the tag is
+        a hash of the input and the fingerprints of the models, by default
+        the serving ones. Returns None while any model is not loaded yet.
+        """
+        if fingerprints is None:
+            fingerprints = self._serving_fingerprints()
+        if any(fingerprints.get(section) is None for section in MODEL_SECTIONS):
+            return None
+
+        key = json.dumps(
+            [
+                input_data.isapre.value,
+                input_data.tipo.value,
+                self._cache_total(input_data.total),
+                [fingerprints[section] for section in MODEL_SECTIONS],
+            ]
+        )
+        return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+    async def predict_batch(
+        self, inputs: List[InferenceInput]
+    ) -> List[PredictionResponse]:
+        """Run one batched prediction per model and return responses in order."""
+        return [scored.response for scored in await self._score_batch(inputs)]
+
+    async def _score_batch(
+        self,
+        inputs: List[InferenceInput],
+        sections: Sequence[ModelSection] = MODEL_SECTIONS,
+    ) -> List[ScoredPrediction]:
+        """
+        Score inputs with the models of the given sections, batched per model.
+
+        Each prediction carries the fingerprints of the adapters that made it,
+        which are no longer the serving ones if a model was reloaded meanwhile.
+        """
+        if not inputs:
+            return []
+
+        model_names = [SECTION_MODELS[section] for section in sections]
+        if self._worker_pool is not None:
+            worker_pool = await self._get_worker_pool()
+            # score() submits before awaiting, so these adapters are the ones
+            # the workers score with
+            adapters = worker_pool.adapters
+            with phase("model_call", "worker_pool"):
+                predictions = await worker_pool.score(inputs, model_names)
+        else:
+            adapters = dict(
+                zip(
+                    model_names,
+                    await asyncio.gather(
+                        *(self._get_adapter(name) for name in model_names)
+                    ),
+                )
+            )
+            predictions = dict(
+                zip(
+                    model_names,
+                    await asyncio.gather(
+                        *(adapters[name].predict_batch(inputs) for name in model_names)
+                    ),
+                )
+            )
+
+        fingerprints = {
+            section: adapters[SECTION_MODELS[section]].fingerprint
+            for section in sections
+        }
+        with phase("response_building"):
+            return [
+                ScoredPrediction(
+                    PredictionResponse(
+                        **{
+                            section: SECTION_RESPONSES[section](
+                                predictions[SECTION_MODELS[section]][i]
+                            )
+                            for section in sections
+                        }
+                    ),
+                    fingerprints,
+                )
+                for i in range(len(inputs))
+            ]
+
+    async def predict_batch_items(self, items: List[Any]) -> BatchPredictionResponse:
+        """Validate raw batch items one by one and score the valid ones."""
+        with phase("validation"):
+            chunk = _validate_records([(item, None) for item in items], 0)
+        return await self._score_chunk(chunk)
+
+    async def predict_stream(
+        self, records: Iterator[Record], chunk_size: int
+    ) -> AsyncIterator[Tuple[BatchPredictionResponse, bool]]:
+        """
+        Score parsed upload records in fixed-size chunks as they are read,
+        yielding each chunk's results and whether it is the last one.
+
+        Chunks are read and validated off the event loop, the next one while
+        the current one is being scored.
+        """
+        loop = asyncio.get_running_loop()
+        chunks = iter_chunks(records, chunk_size)
+        offset = 0
+
+        def read_chunk(offset: int) -> Optional[_ValidatedChunk]:
+            records = next(chunks, None)
+            return None if records is None else _validate_records(records, offset)
+
+        chunk = await loop.run_in_executor(None, read_chunk, offset)
+        while chunk is not None:
+            offset += len(chunk.results)
+            next_chunk = loop.run_in_executor(None, read_chunk, offset)
+            try:
+                scored = await self._score_chunk(chunk)
+            except BaseException:
+                # Let the read finish before the upload is closed
+                await asyncio.wait([next_chunk])
+                raise
+            chunk = await next_chunk
+            yield scored, chunk is None
+
+    async def _score_chunk(self, chunk: "_ValidatedChunk") -> BatchPredictionResponse:
+        """Score the valid items of a validated chunk in place."""
+        predictions = await self.predict_batch(chunk.inputs)
+        for position, prediction in zip(chunk.positions, predictions):
+            chunk.results[position].prediction = prediction
+
+        return BatchPredictionResponse(
+            results=chunk.results,
+            succeeded=len(chunk.inputs),
+            failed=len(chunk.results) - len(chunk.inputs),
+        )
+
+    async def predict_curve(
+        self,
+        isapre: IsapreEnum,
+        tipo: TipoEnum,
+        min_total: int,
+        max_total: int,
+        points: int,
+    ) -> CurveResponse:
+        """Score an evenly spaced grid of totals in one batch per model."""
+        step = (max_total - min_total) / max(points - 1, 1)
+        # Narrow ranges round several points to the same total; keep it once
+        totals = list(
+            dict.fromkeys(round(min_total + step * point) for point in range(points))
+        )
+        predictions = await self.predict_batch(
+            [InferenceInput(isapre=isapre, tipo=tipo, total=total) for total in totals]
+        )
+
+        return CurveResponse(
+            isapre=isapre,
+            tipo=tipo,
+            total=totals,
+            logistic_regression=LogisticRegressionCurve(
+                probability=[p.logistic_regression.probability for p in predictions],
+                chosen_class=[p.logistic_regression.chosen_class for p in predictions],
             ),
-            bayesian_network=BayesianNetworkResponse(
-                probability=bn_result.probability,
-                expected_reimbursement=int(bn_result.expected_amount),
-                expected_wait=int(bn_result.expected_days),
+            bayesian_network=BayesianNetworkCurve(
+                probability=[p.bayesian_network.probability for p in predictions],
+                expected_reimbursement=[
+                    p.bayesian_network.expected_reimbursement for p in predictions
+                ],
+                expected_wait=[p.bayesian_network.expected_wait for p in predictions],
+            ),
+            gmm=GMMCurve(probability=[p.gmm.probability for p in predictions]),
+        )
+
+    async def predict_matrix(self, total: int) -> MatrixResponse:
+        """Score every isapre and tipo combination for a total in one batch."""
+        isapres = list(IsapreEnum)
+        tipos = list(TipoEnum)
+        predictions = await self.predict_batch(
+            [
+                InferenceInput(isapre=isapre, tipo=tipo, total=total)
+                for isapre in isapres
+                for tipo in tipos
+            ]
+        )
+
+        # Predictions come back row-major, one row of tipos per isapre
+        rows = [
+            predictions[row : row + len(tipos)]
+            for row in range(0, len(predictions), len(tipos))
+        ]
+
+        return MatrixResponse(
+            total=total,
+            isapre=isapres,
+            tipo=tipos,
+            logistic_regression=LogisticRegressionMatrix(
+                probability=[
+                    [p.logistic_regression.probability for p in row] for row in rows
+                ],
+                chosen_class=[
+                    [p.logistic_regression.chosen_class for p in row] for row in rows
+                ],
+            ),
+            bayesian_network=BayesianNetworkMatrix(
+                probability=[
+                    [p.bayesian_network.probability for p in row] for row in rows
+                ],
+                expected_reimbursement=[
+                    [p.bayesian_network.expected_reimbursement for p in row]
+                    for row in rows
+                ],
+                expected_wait=[
+                    [p.bayesian_network.expected_wait for p in row] for row in rows
+                ],
+            ),
+            gmm=GMMMatrix(
+                probability=[[p.gmm.probability for p in row] for row in rows]
             ),
-            gmm=GMMResponse(probability=gmm_result.probability),
         )
 
     async def run_debug_inference(self) -> Dict[str, Any]:
@@ -141,11 +633,251 @@ class InferenceService:
 
         return results
 
+    async def warmup(self) -> None:
+        """Load every model concurrently and run a prediction through each."""
+        try:
+            # Import NumPy, pandas and SciPy off the event loop, so the app
+            # keeps answering /ready while they load
+            with startup_timer.measure("import_model_libraries"):
+                await asyncio.get_running_loop().run_in_executor(
+                    None, importlib.import_module, f"{__package__}.adapters"
+                )
+            with startup_timer.measure("load_models"):
+                adapters = await asyncio.gather(
+                    *(self._get_adapter(name) for name in self.MODEL_NAMES)
+                )
+            with startup_timer.measure("warmup_predictions"):
+                await asyncio.gather(
+                    *(adapter.predict(self.WARMUP_INPUT) for adapter in adapters)
+                )
+                if self._worker_pool is not None:
+                    await self.predict_batch([self.WARMUP_INPUT])
+        except Exception as e:
+            self.warmup_error = str(e)
+            raise
+
+        self.warmup_error = None
+        self.ready = True
+        startup_timer.mark("models_ready")
+
+    async def reload_model(self, model_name: str) -> bool:
+        """
+        Reload a model if its version in R2 changed.
+
+        The new model is downloaded, wrapped and warmed up while requests keep
+        using the current adapter, which is then swapped in a single step.
+        """
+        cache_name = self.MODEL_NAMES[model_name]
+        remote_version = await model_cache.get_remote_version(cache_name)
+        # Compare with the serving adapter rather than the model cache, which
+        # already has the new version when a previous reload failed half-way
+        current = self._adapters.get(model_name)
+        if remote_version is None or (
+            current is not None and remote_version == current.version
+        ):
+            return False
+
+        model = await model_cache.refresh_model(cache_name)
+        version = model_cache.get_version(cache_name)
+        fingerprint = model_cache.get_fingerprint(cache_name)
+
+        loop = asyncio.get_running_loop()
+        adapter = await loop.run_in_executor(None, _create_adapter, model_name, model)
+        await loop.run_in_executor(None, adapter.score_batch, [self.WARMUP_INPUT])
+        adapter.version = version
+        adapter.fingerprint = fingerprint
+
+        # Swap the adapter in; requests already running keep the old one
+        self._adapters[model_name] = adapter
+        self._prediction_cache.clear()
+        inference_executor.register_adapter(adapter)
+        if self._worker_pool is not None and self._worker_pool.started:
+            # Re-forked off the loop; requests use the old workers meanwhile
+            async with self._worker_pool_lock:
+                await self._worker_pool.start(dict(self._adapters))
+
+        logger.info(
+            "Reloaded model",
+            extra={
+                "fields": {
+                    "model": model_name,
+                    "model_version": version,
+                }
+            },
+        )
+        return True
+
+    async def watch_model_versions(self, interval: float) -> None:
+        """Poll R2 for new model versions and hot reload them."""
+        while True:
+            await asyncio.sleep(interval)
+            for model_name in self.MODEL_NAMES:
+                # Models that were never loaded are picked up on first use
+                if model_name not in self._adapters:
+                    continue
+                try:
+                    await self.reload_model(model_name)
+                except Exception:
+                    logger.exception(
+                        "Failed to reload model",
+                        extra={"fields": {"model": model_name}},
+                    )
+
+    def get_model_versions(self) -> Dict[str, Optional[str]]:
+        """Get the version of each model currently serving requests."""
+        return {
+            model_name: self._adapters[model_name].version
+            for model_name in self.MODEL_NAMES
+            if model_name in self._adapters
+        }
+
+    def shutdown(self) -> None:
+        """Stop background workers."""
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+        inference_executor.shutdown()
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get model cache and adapter creation counters."""
+        return {
+            "models": model_cache.get_stats(),
+            "adapters": {
+                "loaded": sorted(self._adapters),
+                "versions": self.get_model_versions(),
+                "loads_started": self._adapter_loads.started,
+                "loads_coalesced": self._adapter_loads.coalesced,
+            },
+            "predictions": self._prediction_cache.get_stats(),
+            "micro_batching": (
+                {
+                    ",".join(sections): batcher.get_stats()
+                    for sections, batcher in self._micro_batchers.items()
+                }
+                if self.micro_batch_size > 0
+                else None
+            ),
+        }
+
     async def clear_model_cache(self) -> None:
         """Clear all cached models."""
         self._adapters.clear()
+        self._prediction_cache.clear()
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
         await model_cache.clear_cache()
 
 
+def _logistic_regression_response(
+    result: ModelPrediction,
+) -> LogisticRegressionResponse:
+    return LogisticRegressionResponse(
+        probability=result.probability, chosen_class=bool(result.predicted_class)
+    )
+
+
+def _bayesian_network_response(
+    result: BayesianNetworkPrediction,
+) -> BayesianNetworkResponse:
+    return BayesianNetworkResponse(
+        probability=result.probability,
+        expected_reimbursement=int(result.expected_amount),
+        expected_wait=int(result.expected_days),
+    )
+
+
+def _gmm_response(result: GMMPrediction) -> GMMResponse:
+    return GMMResponse(probability=result.probability)
+
+
+class _ValidatedChunk(NamedTuple):
+    """Batch items with their errors filled in, and the valid ones' inputs."""
+
+    results: List[BatchPredictionItem]
+    positions: List[int]
+    inputs: List[InferenceInput]
+
+
+def _validate_records(records: List[Record], offset: int) -> _ValidatedChunk:
+    """Validate parsed records one by one, numbering them from an offset."""
+    results = []
+    positions = []
+    inputs = []
+    for position, (item, error) in enumerate(records):
+        result = BatchPredictionItem(index=offset + position)
+        results.append(result)
+        if error is not None:
+            result.errors = [error]
+            continue
+        try:
+            inputs.append(InferenceInput.model_validate(item))
+            positions.append(position)
+        except ValidationError as e:
+            result.errors = [
+                BatchItemError(
+                    loc=list(error["loc"]), msg=error["msg"], type=error["type"]
+                )
+                for error in e.errors()
+            ]
+    return _ValidatedChunk(results, positions, inputs)
+
+
+# Model behind each response section
+SECTION_MODELS = {
+    "logistic_regression": "logistic_regressor",
+    "bayesian_network": "discrete_bayesian_network",
+    "gmm": "gmm",
+}
+
+# Builds each response section from its model's prediction
+SECTION_RESPONSES = {
+    "logistic_regression": _logistic_regression_response,
+    "bayesian_network": _bayesian_network_response,
+    "gmm": _gmm_response,
+}
+
+
+def _create_adapter(model_name: str, model: Any) -> "ModelAdapter":
+    """Build a model adapter, importing the numeric libraries on first use."""
+    from .adapters import ModelAdapterFactory
+
+    return ModelAdapterFactory.create_adapter(model_name, model)
+
+
 # Global service instance
-inference_service = InferenceService()
+inference_service = InferenceService(
+    worker_processes=settings.INFERENCE_WORKER_PROCESSES,
+    prediction_cache_size=settings.PREDICTION_CACHE_SIZE,
+    prediction_cache_ttl=settings.PREDICTION_CACHE_TTL_SECONDS,
+    total_bucket=settings.PREDICTION_CACHE_TOTAL_BUCKET,
+    micro_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    micro_batch_wait=settings.MICRO_BATCH_MAX_WAIT_SECONDS,
+    micro_batch_in_flight=settings.MICRO_BATCH_MAX_IN_FLIGHT,
+)
+
+
+class _PredictionCacheCollector(Collector):
+    """Reads the /predict response cache's own counters at scrape time."""
+
+    def collect(self) -> Iterator[Metric]:
+        stats = inference_service._prediction_cache.get_stats()
+        lookups = CounterMetricFamily(
+            "prediction_cache_lookups",
+            "/predict response cache lookups by result (hit, miss)",
+            labels=["result"],
+        )
+        lookups.add_metric(["hit"], stats["hits"])
+        lookups.add_metric(["miss"], stats["misses"])
+        yield lookups
+        yield GaugeMetricFamily(
+            "prediction_cache_entries",
+            "Responses held in the /predict response cache",
+            value=stats["size"],
+        )
+
+
+scrape_registry.register(_PredictionCacheCollector())
+scrape_gauge(
+    "models_ready",
+    "Whether every model is loaded and warmed up",
+    lambda: int(inference_service.ready),
+)
@@ -0,0 +1,67 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process was started, where the OS tells us."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the command name, which may itself contain spaces;
+            # the start time is field 22 of the full line
+            fields = f.read().rsplit(")", 1)[1].split()
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTimer:
+    """
+    Breakdown of where cold start time goes, from process start to models ready.
+
+    Milestones are recorded as milliseconds since the process started (or
+    since this module was imported, where the process start time is not
+    available) and steps as their own durations. Only the first recording of
+    each name is kept, so later reloads don't overwrite the startup figures.
+    """
+
+    def __init__(self):
+        self._created = time.perf_counter()
+        self._process_age = _process_age()
+        self.milestones: Dict[str, float] = {}
+        self.steps: Dict[str, float] = {}
+        if self._process_age is not None:
+            self.milestones["startup_module_imported"] = round(
+                self._process_age * 1000, 3
+            )
+
+    def _since_start(self) -> float:
+        return (self._process_age or 0.0) + time.perf_counter() - self._created
+
+    def mark(self, name: str) -> None:
+        """Record that a milestone was reached."""
+        self.milestones.setdefault(name, round(self._since_start() * 1000, 3))
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Record how long a startup step takes."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.setdefault(
+                name, round((time.perf_counter() - started) * 1000, 3)
+            )
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "clock": "process" if self._process_age is not None else "import",
+            "milestones_ms": dict(self.milestones),
+            "steps_ms": dict(self.steps),
+        }
+
+
+# Global timer, created as early as the inference package is imported
+startup_timer = StartupTimer()
@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+from itertools import islice
+from typing import (
+    IO,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+)
+
+from .schemas import BatchItemError, BatchPredictionItem, BatchPredictionResponse
+
+StreamFormat = Literal["csv", "ndjson"]
+
+# Upload content types accepted by the streaming endpoint
+INPUT_FORMATS: Dict[str, StreamFormat] = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/x-jsonlines": "ndjson",
+}
+
+MEDIA_TYPES: Dict[StreamFormat, str] = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+CSV_COLUMNS = [
+    "index",
+    "lr_probability",
+    "lr_chosen_class",
+    "bn_probability",
+    "bn_expected_reimbursement",
+    "bn_expected_wait",
+    "gmm_probability",
+    "errors",
+]
+
+# A parsed upload row: the raw item to validate, or the error that kept it
+# from being parsed
+Record = Tuple[Optional[Dict[str, Any]], Optional[BatchItemError]]
+
+
+def read_records(file: IO[bytes], input_format: StreamFormat) -> Iterator[Record]:
+    """Lazily parse an uploaded CSV (with header) or NDJSON file."""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", errors="replace", newline="")
+
+    if input_format == "csv":
+        for row in csv.DictReader(text):
+            yield row, None
+        return
+
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), None
+        except json.JSONDecodeError as e:
+            yield None, BatchItemError(
+                loc=[], msg=f"Invalid JSON: {e.msg}", type="json_invalid"
+            )
+
+
+def iter_chunks(records: Iterator[Record], chunk_size: int) -> Iterator[List[Record]]:
+    """Group records into lists of at most chunk_size."""
+    while chunk := list(islice(records, chunk_size)):
+        yield chunk
+
+
+async def encode_stream(
+    chunks: AsyncIterator[Tuple[BatchPredictionResponse, bool]],
+    output_format: StreamFormat,
+) -> AsyncIterator[str]:
+    """Serialize scored chunks, each flagged whether it is the last, as they arrive.
+
+    NDJSON output interleaves a progress record after every chunk, the last
+    one marked done. CSV output is one row per input row.
+    """
+    if output_format == "csv":
+        yield ",".join(CSV_COLUMNS) + "\n"
+
+    rows = succeeded = failed = 0
+    done = False
+    async for chunk, done in chunks:
+        rows += len(chunk.results)
+        succeeded += chunk.succeeded
+        failed += chunk.failed
+
+        if output_format == "csv":
+            yield _csv_rows(chunk.results)
+        else:
+            lines = [item.model_dump_json(exclude_none=True) for item in chunk.results]
+            lines.append(_progress(rows, succeeded, failed, done))
+            yield "\n".join(lines) + "\n"
+
+    # An empty upload has no chunk to carry the done record
+    if output_format == "ndjson" and not done:
+        yield _progress(rows, succeeded, failed, done=True) + "\n"
+
+
+def _progress(rows: int, succeeded: int, failed: int, done: bool) -> str:
+    return json.dumps(
+        {
+            "progress": {
+                "rows": rows,
+                "succeeded": succeeded,
+                "failed": failed,
+                "done": done,
+            }
+        }
+    )
+
+
+def _csv_rows(items: List[BatchPredictionItem]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    for item in items:
+        if item.prediction is None:
+            errors = "; ".join(
+                ": ".join(filter(None, [".".join(map(str, error.loc)), error.msg]))
+                for error in item.errors
+            )
+            writer.writerow([item.index] + [""] * (len(CSV_COLUMNS) - 2) + [errors])
+            continue
+
+        prediction = item.prediction
+        writer.writerow(
+            [
+                item.index,
+                prediction.logistic_regression.probability,
+                prediction.logistic_regression.chosen_class,
+                prediction.bayesian_network.probability,
+                prediction.bayesian_network.expected_reimbursement,
+                prediction.bayesian_network.expected_wait,
+                prediction.gmm.probability,
+                "",
+            ]
+        )
+    return buffer.getvalue()
@@ -0,0 +1,167 @@
+import asyncio
+import gc
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from .logs import configure_worker_logging, record_timing
+from .metrics import model_inference_duration, model_inference_rows
+from .schemas import (
+    BayesianNetworkPrediction,
+    GMMPrediction,
+    InferenceInput,
+    IsapreEnum,
+    ModelPrediction,
+    TipoEnum,
+)
+
+if TYPE_CHECKING:
+    from .adapters import ModelAdapter
+
+
+# Compact wire formats between the parent and the scoring workers
+InputRow = Tuple[str, str, int]
+ScoreRow = Tuple[Any, ...]
+
+# Fields sent back for each model's predictions, and the type they rebuild
+PREDICTION_FIELDS = {
+    "logistic_regressor": (ModelPrediction, ("probability", "predicted_class")),
+    "discrete_bayesian_network": (
+        BayesianNetworkPrediction,
+        ("probability", "expected_amount", "expected_days"),
+    ),
+    "gmm": (GMMPrediction, ("probability",)),
+}
+
+# Adapters loaded by the parent before forking, shared copy-on-write
+_pool_adapters: Dict[str, "ModelAdapter"] = {}
+
+
+def _noop() -> None:
+    """Task used to make the pool fork its workers right away."""
+
+
+def _score_rows(
+    rows: List[InputRow], model_names: Sequence[str]
+) -> Tuple[Dict[str, List[ScoreRow]], Dict[str, float]]:
+    """
+    Score rows with the given models inside a worker process, also returning
+    how long each model took.
+    """
+    # Rows were validated by the parent, so skip validation here
+    inputs = [
+        InferenceInput.model_construct(
+            isapre=IsapreEnum(isapre), tipo=TipoEnum(tipo), total=total
+        )
+        for isapre, tipo, total in rows
+    ]
+    scored = {}
+    durations = {}
+    for model_name in model_names:
+        _, fields = PREDICTION_FIELDS[model_name]
+        started = time.perf_counter()
+        predictions = _pool_adapters[model_name].score_batch(inputs)
+        durations[model_name] = time.perf_counter() - started
+        scored[model_name] = [
+            tuple(getattr(prediction, field) for field in fields)
+            for prediction in predictions
+        ]
+    return scored, durations
+
+
+class InferenceWorkerPool:
+    """
+    Pool of forked scoring processes sharing the parent's loaded models.
+
+    The parent loads every model once and then forks the workers, so model
+    memory is shared copy-on-write instead of being loaded per process. Each
+    request is sent to one worker as plain tuples and scored there with the
+    models it asks for.
+    """
+
+    def __init__(self, processes: int):
+        self.processes = processes
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Adapters the current workers were forked with
+        self.adapters: Dict[str, "ModelAdapter"] = {}
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    async def start(self, adapters: Dict[str, "ModelAdapter"]) -> None:
+        """
+        Fork workers with the given adapters preloaded, then swap them in.
+
+        Forking runs off the event loop, and requests keep using the current
+        workers until the new ones are ready. Work already sent to the old
+        workers still finishes there.
+        """
+        adapters = dict(adapters)
+        pool = await asyncio.get_running_loop().run_in_executor(
+            None, self._fork, adapters
+        )
+        old_pool, self._pool, self.adapters = self._pool, pool, adapters
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+
+    def _fork(self, adapters: Dict[str, "ModelAdapter"]) -> ProcessPoolExecutor:
+        """Fork a pool of workers with the given adapters preloaded."""
+        _pool_adapters.clear()
+        _pool_adapters.update(adapters)
+
+        # Move the loaded models out of the collector's reach so the workers'
+        # garbage collections don't write to (and copy) the shared pages
+        gc.collect()
+        gc.freeze()
+
+        pool = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=configure_worker_logging,
+        )
+        # Fork every worker now, while the models are loaded and frozen
+        for future in [pool.submit(_noop) for _ in range(self.processes)]:
+            future.result()
+        return pool
+
+    async def score(
+        self, inputs: List[InferenceInput], model_names: Sequence[str]
+    ) -> Dict[str, List[Any]]:
+        """
+        Score inputs with the given models on one of the workers.
+
+        The work is submitted before the first await, so it runs on the
+        workers, and with the adapters, current at the time of the call.
+        """
+        if self._pool is None:
+            raise RuntimeError("Inference worker pool has not been started")
+
+        rows = [(i.isapre.value, i.tipo.value, i.total) for i in inputs]
+        scored, durations = await asyncio.get_running_loop().run_in_executor(
+            self._pool, _score_rows, rows, list(model_names)
+        )
+
+        # Measured in the worker, so they leave out queueing for a worker
+        for model_name, duration in durations.items():
+            model_inference_duration.labels(model_name).observe(duration)
+            record_timing(model_name, duration)
+            model_inference_rows.labels(model_name).inc(len(inputs))
+
+        # Values come from validated predictions, so skip validation here
+        predictions = {}
+        for model_name, model_rows in scored.items():
+            prediction_type, fields = PREDICTION_FIELDS[model_name]
+            predictions[model_name] = [
+                prediction_type.model_construct(**dict(zip(fields, row)))
+                for row in model_rows
+            ]
+        return predictions
+
+    def shutdown(self) -> None:
+        """Stop the workers."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
+            gc.unfreeze()
@@ -1,15 +1,110 @@
-from typing import Dict, Any
-from fastapi import FastAPI
+import asyncio
+import hmac
+import logging
+import tempfile
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, Dict, Any, List, Optional, Tuple
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
+from inference import inference_service
+from inference.config import settings as inference_settings
 from inference.dependencies import InferenceServiceDep
-from inference.schemas import InferenceInput, PredictionResponse
+from inference.logs import (
+    RequestContextMiddleware,
+    configure_logging,
+    request_sampled,
+    request_timings,
+)
+from inference.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from inference.metrics import MetricsMiddleware, render as render_metrics
+from inference.profiling import ProfilingMiddleware, profile_store, record_elapsed
+from inference.startup import startup_timer
+from inference.schemas import (
+    InferenceInput,
+    IsapreEnum,
+    TipoEnum,
+    PredictionResponse,
+    BatchPredictionRequest,
+    BatchPredictionResponse,
+    CurveResponse,
+    MAX_CURVE_POINTS,
+    MatrixResponse,
+    ModelSection,
+    MODEL_SECTIONS,
+)
+from inference.streaming import (
+    INPUT_FORMATS,
+    MEDIA_TYPES,
+    StreamFormat,
+    encode_stream,
+    read_records,
+)
+
+startup_timer.mark("imports_done")
+
+log_listener = configure_logging(inference_settings.LOG_LEVEL)
+logger = logging.getLogger(__name__)
+
+# Uploads to /predict/stream are written to disk in blocks of this size
+UPLOAD_SPOOL_BLOCK_SIZE = 1024 * 1024
+
+
+async def warmup_models() -> None:
+    """Warm up all models, retrying until it succeeds."""
+    while True:
+        try:
+            await inference_service.warmup()
+            logger.info(
+                "Models warmed up, ready to serve",
+                extra={"fields": {"startup": startup_timer.report()}},
+            )
+            return
+        except Exception:
+            logger.exception("Model warmup failed")
+            await asyncio.sleep(inference_settings.WARMUP_RETRY_SECONDS)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_timer.mark("serving")
+    logger.info(
+        "Serving requests", extra={"fields": {"startup": startup_timer.report()}}
+    )
+    background_tasks = []
+
+    # Warm up in the background so /ready can answer while models load
+    if inference_settings.WARMUP_ON_STARTUP:
+        background_tasks.append(asyncio.create_task(warmup_models()))
+    else:
+        # Models load on first use instead, so there's nothing to wait for
+        inference_service.ready = True
+
+    if inference_settings.MODEL_RELOAD_INTERVAL_SECONDS > 0:
+        background_tasks.append(
+            asyncio.create_task(
+                inference_service.watch_model_versions(
+                    inference_settings.MODEL_RELOAD_INTERVAL_SECONDS
+                )
+            )
+        )
+
+    yield
+
+    for task in background_tasks:
+        task.cancel()
+    inference_service.shutdown()
+    log_listener.stop()
+
 
 app = FastAPI(
     title="Predictor de Reembolsos",
     description="API para predicción de reembolsos de seguros de salud usando múltiples modelos de ML",
     version="1.0.0",
+    lifespan=lifespan,
 )
+startup_timer.mark("app_created")
 
 
 app.add_middleware(
@@ -19,6 +114,17 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(
+    ProfilingMiddleware,
+    store=profile_store,
+    token=inference_settings.PROFILING_TOKEN,
+    sample_rate=inference_settings.PROFILING_SAMPLE_RATE,
+    interval=inference_settings.PROFILING_INTERVAL_SECONDS,
+)
+app.add_middleware(
+    RequestContextMiddleware, sample_rate=inference_settings.LOG_SAMPLE_RATE
+)
 
 
 @app.get("/")
@@ -26,47 +132,150 @@ def read_root():
     return {"Hello": "World"}
 
 
+@app.get("/ready")
+async def ready(inference_service: InferenceServiceDep) -> Dict[str, str]:
+    """Readiness probe: 503 until every model is loaded and warmed up."""
+    if not inference_service.ready:
+        detail = "Models are warming up"
+        if inference_service.warmup_error:
+            detail = f"Model warmup failed: {inference_service.warmup_error}"
+        raise HTTPException(status_code=503, detail=detail)
+
+    return {"status": "ready"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> Response:
+    """Request, model and cache metrics in the Prometheus text format."""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/debug")
 async def debug(inference_service: InferenceServiceDep) -> Dict[str, Any]:
     """Debug endpoint that runs inference tests with all models."""
-    print("=== Debug endpoint called ===")
-
     results = await inference_service.run_debug_inference()
-
-    # Print results to console (as requested)
-    print("\n=== LOGISTIC REGRESSION ===")
-    if "logistic_regression" in results:
-        lr = results["logistic_regression"]
-        print(f"Input: {lr['input']}")
-        print(f"P(reembolso)  = {lr['probability']:.3f}")
-        print(f"Class chosen  = {lr['predicted_class']}  ({lr['interpretation']})")
-
-    print("\n=== BAYESIAN NETWORK ===")
-    if "bayesian_network" in results:
-        bn = results["bayesian_network"]
-        print(f"Input: {bn['input']}")
-        print(f"Probabilidad de reembolso  : {bn['probability']:.2%}")
-        print(f"Monto esperado (CLP)       : ${bn['expected_amount_clp']:,.0f}")
-        print(f"Días para aprobación (mean): {bn['expected_days']:.1f}")
-
-    print("\n=== GMM MODEL ===")
-    if "gmm" in results:
-        gmm = results["gmm"]
-        print(f"Input: {gmm['input']}")
-        print(f"Model P(approved) = {gmm['probability']:.3%}")
-
-    if "error" in results:
-        print(f"\n=== ERROR ===")
-        print(f"Error: {results['error']}")
-
-        print("=== Debug endpoint completed ===\n")
+    logger.info("Debug inference completed", extra={"fields": {"results": results}})
 
     return results
 
 
+@app.get("/debug/startup")
+async def debug_startup() -> Dict[str, Any]:
+    """Time from process start to imports done, serving and models ready."""
+    return startup_timer.report()
+
+
+@app.get("/debug/cache")
+async def debug_cache(inference_service: InferenceServiceDep) -> Dict[str, Any]:
+    """Model cache hit, load and coalescing counters."""
+    return inference_service.get_cache_stats()
+
+
+def check_profiling_token(token: Optional[str]) -> None:
+    """Reject profile report requests without the admin token."""
+    expected = inference_settings.PROFILING_TOKEN
+    # Without a token nobody may read reports, sampled ones included
+    if not expected:
+        raise HTTPException(
+            status_code=403, detail="Profile reports need PROFILING_TOKEN to be set"
+        )
+    if not hmac.compare_digest((token or "").encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+@app.get("/debug/profiles")
+async def list_profiles(
+    x_profile: Optional[str] = Header(None),
+) -> List[Dict[str, Any]]:
+    """Summaries of the most recent request profiles, newest first."""
+    check_profiling_token(x_profile)
+    return profile_store.list()
+
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str, x_profile: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """Phase timings and sampled call tree of a profiled request."""
+    check_profiling_token(x_profile)
+    report = profile_store.get(profile_id)
+    if report is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return report
+
+
+def parse_model_sections(models: Optional[str]) -> List[ModelSection]:
+    """Parse a comma-separated list of models, defaulting to all of them."""
+    if models is None:
+        return list(MODEL_SECTIONS)
+
+    sections: List[ModelSection] = []
+    for name in models.split(","):
+        name = name.strip()
+        if name not in MODEL_SECTIONS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown model {name!r}, expected one of: "
+                + ", ".join(MODEL_SECTIONS),
+            )
+        if name not in sections:
+            sections.append(name)
+    return sections
+
+
+def request_timeout(timeout_ms: Optional[int]) -> Optional[float]:
+    """Per-model deadline, from ``timeout_ms`` or the MODEL_TIMEOUT_SECONDS setting."""
+    if timeout_ms is not None:
+        return timeout_ms / 1000
+    return inference_settings.MODEL_TIMEOUT_SECONDS or None
+
+
+async def run_prediction(
+    inference_service: InferenceServiceDep,
+    input_data: InferenceInput,
+    sections: List[ModelSection],
+    timeout_ms: Optional[int],
+) -> Tuple[PredictionResponse, Optional[str]]:
+    """Score an input within the request's deadline and log the outcome."""
+    try:
+        result, etag = await inference_service.predict_models_tagged(
+            input_data, sections, request_timeout(timeout_ms)
+        )
+    except Exception:
+        logger.exception(
+            "Prediction failed",
+            extra={"fields": {"input": input_data.model_dump(mode="json")}},
+        )
+        raise
+
+    if request_sampled():
+        logger.info(
+            "Prediction completed",
+            extra={
+                "fields": {
+                    "input": input_data.model_dump(mode="json"),
+                    "prediction": result.model_dump(mode="json"),
+                    "timings_ms": request_timings(),
+                    "model_versions": inference_service.get_model_versions(),
+                }
+            },
+        )
+
+    return result, etag
+
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(
-    input_data: InferenceInput, inference_service: InferenceServiceDep
+    input_data: InferenceInput,
+    inference_service: InferenceServiceDep,
+    models: Optional[str] = Query(
+        None,
+        description="Comma-separated models to run: "
+        "logistic_regression, bayesian_network, gmm (default: all)",
+    ),
+    timeout_ms: Optional[int] = Query(
+        None, gt=0, description="Per-model deadline in milliseconds"
+    ),
 ) -> PredictionResponse:
     """
     Predict reimbursement outcomes using all available models.
@@ -77,28 +286,241 @@ async def predict(
     - Gaussian Mixture Model (GMM)
 
     Returns predictions from all models with probabilities and expected outcomes.
+    A subset of models can be requested with ``models``. With a deadline, from
+    ``timeout_ms`` or the MODEL_TIMEOUT_SECONDS setting, models that miss it
+    are left out and listed in ``timed_out``.
     """
-    print(f"=== Prediction request received ===")
-    print(f"Input - Isapre: {input_data.isapre.value}")
-    print(f"Input - Tipo: {input_data.tipo.value}")
-    print(f"Input - Total: ${input_data.total:,} CLP")
+    # Request parsing and validation happen before the handler runs
+    record_elapsed("validation")
 
-    try:
-        # Run all models concurrently
-        result = await inference_service.predict_all_models(input_data)
+    sections = parse_model_sections(models)
+    result, _ = await run_prediction(
+        inference_service, input_data, sections, timeout_ms
+    )
+    return result
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)."""
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
+
+@app.get("/predict", response_model=PredictionResponse)
+async def predict_cacheable(
+    inference_service: InferenceServiceDep,
+    response: Response,
+    isapre: IsapreEnum,
+    tipo: TipoEnum,
+    total: int = Query(..., gt=0, description="Total amount in CLP"),
+    timeout_ms: Optional[int] = Query(
+        None, gt=0, description="Per-model deadline in milliseconds"
+    ),
+    if_none_match: Optional[str] = Header(None),
+) -> Any:
+    """
+    Predict reimbursement outcomes with all models, as a cacheable GET.
+
+    Answers the same as ``POST /predict``, deadlines included. The response
+    carries an ``ETag`` derived from the input and the models that answered,
+    and a ``Cache-Control`` header letting browsers and CDNs reuse it;
+    conditional requests whose ETag still matches get a 304 without running
+    any model. Responses missing a model aren't cacheable. Use the parameters
+    in the order isapre, tipo, total so equal lookups share a cache entry.
+    """
+    record_elapsed("validation")
+    input_data = InferenceInput(isapre=isapre, tipo=tipo, total=total)
 
-        print(f"=== Prediction completed successfully ===")
-        print(
-            f"Logistic Regression - Probability: {result.logistic_regression.probability:.3f}, Class: {result.logistic_regression.chosen_class}"
+    etag = inference_service.prediction_etag(input_data)
+    cache_control = (
+        f"public, max-age={inference_settings.PREDICTION_HTTP_MAX_AGE_SECONDS}"
+    )
+    if etag is not None and etag_matches(if_none_match, etag):
+        return Response(
+            status_code=304, headers={"ETag": etag, "Cache-Control": cache_control}
         )
-        print(
-            f"Bayesian Network - Probability: {result.bayesian_network.probability:.3f}, Amount: ${result.bayesian_network.expected_reimbursement:,}, Days: {result.bayesian_network.expected_wait}"
+
+    # Tagged after the models that answered, which may have been reloaded
+    # since the check above
+    result, etag = await run_prediction(
+        inference_service, input_data, list(MODEL_SECTIONS), timeout_ms
+    )
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = cache_control
+    else:
+        response.headers["Cache-Control"] = "no-store"
+
+    return result
+
+
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(
+    request: BatchPredictionRequest, inference_service: InferenceServiceDep
+) -> BatchPredictionResponse:
+    """
+    Predict reimbursement outcomes for many inputs in a single call.
+
+    Each model runs once over the whole batch. Results are returned in input
+    order, and items that fail validation are reported individually instead
+    of failing the whole batch.
+    """
+    record_elapsed("validation")
+    result = await inference_service.predict_batch_items(request.items)
+
+    if request_sampled():
+        logger.info(
+            "Batch prediction completed",
+            extra={
+                "fields": {
+                    "items": len(request.items),
+                    "succeeded": result.succeeded,
+                    "failed": result.failed,
+                    "timings_ms": request_timings(),
+                    "model_versions": inference_service.get_model_versions(),
+                }
+            },
         )
-        print(f"GMM - Probability: {result.gmm.probability:.3f}")
 
-        return result
+    return result
+
 
-    except Exception as e:
-        print(f"=== Prediction failed ===")
-        print(f"Error: {str(e)}")
+async def spool_upload(request: Request, max_bytes: int) -> BinaryIO:
+    """
+    Copy a request body to a temporary file, rejecting it with a 413 once it
+    grows past ``max_bytes``.
+
+    Writes go through the default executor in blocks of
+    ``UPLOAD_SPOOL_BLOCK_SIZE`` bytes, so the disk never blocks the event loop.
+    """
+    loop = asyncio.get_running_loop()
+    upload = await loop.run_in_executor(None, tempfile.TemporaryFile)
+    try:
+        size = 0
+        pending = bytearray()
+        async for data in request.stream():
+            size += len(data)
+            if size > max_bytes:
+                raise HTTPException(
+                    status_code=413, detail=f"Upload larger than {max_bytes} bytes"
+                )
+            pending += data
+            if len(pending) >= UPLOAD_SPOOL_BLOCK_SIZE:
+                await loop.run_in_executor(None, upload.write, bytes(pending))
+                pending.clear()
+        await loop.run_in_executor(None, upload.write, bytes(pending))
+    except BaseException:
+        upload.close()
         raise
+    return upload
+
+
+@app.post("/predict/stream")
+async def predict_stream(
+    request: Request,
+    inference_service: InferenceServiceDep,
+    output_format: StreamFormat = Query("ndjson", alias="format"),
+) -> StreamingResponse:
+    """
+    Score an uploaded CSV or NDJSON claims file of any size.
+
+    The request body is a CSV file with an isapre,tipo,total header
+    (Content-Type: text/csv) or one JSON object per line (Content-Type:
+    application/x-ndjson). Rows are parsed and scored in fixed-size chunks
+    and results are streamed back as NDJSON, with progress records after
+    every chunk, or as CSV. Invalid rows are reported individually.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    input_format = INPUT_FORMATS.get(content_type.lower())
+    if input_format is None:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported content type, expected one of: {', '.join(INPUT_FORMATS)}",
+        )
+
+    max_bytes = inference_settings.STREAM_MAX_UPLOAD_BYTES
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise HTTPException(
+            status_code=413, detail=f"Upload larger than {max_bytes} bytes"
+        )
+
+    # Spool the upload to disk before responding: the response stream would
+    # otherwise compete with the body for ASGI receive messages, and keeping
+    # it on disk holds memory flat whatever the file size
+    upload = await spool_upload(request, max_bytes)
+    logger.info(
+        "Streaming prediction request received",
+        extra={"fields": {"bytes": upload.tell(), "input_format": input_format}},
+    )
+    upload.seek(0)
+
+    async def scored_chunks():
+        rows = failed = 0
+        async for chunk, last in inference_service.predict_stream(
+            read_records(upload, input_format), inference_settings.STREAM_CHUNK_SIZE
+        ):
+            rows += len(chunk.results)
+            failed += chunk.failed
+            if request_sampled():
+                logger.info(
+                    "Streaming prediction progress",
+                    extra={"fields": {"rows": rows, "failed": failed}},
+                )
+            yield chunk, last
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            async for text in encode_stream(scored_chunks(), output_format):
+                yield text
+        finally:
+            upload.close()
+
+    return StreamingResponse(stream(), media_type=MEDIA_TYPES[output_format])
+
+
+@app.get("/predict/curve", response_model=CurveResponse)
+async def predict_curve(
+    inference_service: InferenceServiceDep,
+    isapre: IsapreEnum,
+    tipo: TipoEnum,
+    min_total: int = Query(
+        10_000, alias="min", gt=0, description="Lowest total in CLP"
+    ),
+    max_total: int = Query(
+        1_000_000, alias="max", gt=0, description="Highest total in CLP"
+    ),
+    points: int = Query(50, ge=2, le=MAX_CURVE_POINTS),
+) -> CurveResponse:
+    """
+    Predict how every model's output changes with the total amount.
+
+    Scores an evenly spaced grid of totals between min and max for a fixed
+    isapre and tipo in one batched call per model, returning column arrays.
+    """
+    if max_total <= min_total:
+        raise HTTPException(status_code=400, detail="max must be greater than min")
+
+    return await inference_service.predict_curve(
+        isapre, tipo, min_total, max_total, points
+    )
+
+
+@app.get("/predict/matrix", response_model=MatrixResponse)
+async def predict_matrix(
+    inference_service: InferenceServiceDep,
+    total: int = Query(..., gt=0, description="Total amount in CLP"),
+) -> MatrixResponse:
+    """
+    Predict every isapre and tipo combination for a single total.
+
+    Each model scores all combinations in one batched call. Model outputs are
+    returned as matrices indexed by [isapre][tipo], following the order of
+    the isapre and tipo label lists.
+    """
+    return await inference_service.predict_matrix(total)
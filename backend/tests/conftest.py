@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+# Run from backend/ or the repository root alike
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The R2 settings are required at import time but never used by the tests
+for name in (
+    "CLOUDFLARE_ACCOUNT_ID",
+    "CLOUDFLARE_R2_ACCESS_KEY_ID",
+    "CLOUDFLARE_R2_SECRET_ACCESS_KEY",
+    "R2_BUCKET_NAME",
+    "R2_NAMESPACE",
+):
+    os.environ.setdefault(name, "test")
+
+from benchmarks.standins import (  # noqa: E402
+    StandInBayesianNetwork,
+    StandInRowProba,
+    make_claims,
+    make_logistic_regressor,
+)
+from inference.service import InferenceService, _create_adapter  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def claims():
+    """Random claims covering every (isapre, tipo) pair and a wide range of totals."""
+    claims, _ = make_claims(n=500, seed=1)
+    return claims
+
+
+@pytest.fixture(scope="session")
+def logistic_regressor():
+    return make_logistic_regressor()
+
+
+@pytest.fixture(scope="session")
+def bayesian_network():
+    return StandInBayesianNetwork()
+
+
+@pytest.fixture(scope="session")
+def row_proba():
+    return StandInRowProba()
+
+
+@pytest.fixture(scope="session")
+def adapters(logistic_regressor, bayesian_network, row_proba):
+    """Adapters for every stand-in model, as the service builds them."""
+    adapters = {}
+    for model_name, model in (
+        ("logistic_regressor", logistic_regressor),
+        ("discrete_bayesian_network", bayesian_network),
+        ("gmm", row_proba),
+    ):
+        adapter = _create_adapter(model_name, model)
+        adapter.version = "1"
+        adapter.fingerprint = f"{model_name}-1"
+        adapters[model_name] = adapter
+    return adapters
+
+
+@pytest.fixture
+def make_service(adapters):
+    """Build an InferenceService already serving the stand-in adapters."""
+
+    def make_service(**kwargs) -> InferenceService:
+        service = InferenceService(**kwargs)
+        service._adapters.update(adapters)
+        return service
+
+    return make_service
@@ -0,0 +1,132 @@
+import asyncio
+from typing import List
+
+import pytest
+
+from inference.batching import MicroBatcher
+from inference.schemas import InferenceInput, IsapreEnum, TipoEnum
+
+
+def _input(total: int) -> InferenceInput:
+    return InferenceInput(isapre=IsapreEnum.FONASA, tipo=TipoEnum.DENTAL, total=total)
+
+
+async def _settle() -> None:
+    """Let the predictions queue up and their batches start."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+class FakeModel:
+    """Scores batches by doubling totals, holding each batch until released."""
+
+    def __init__(self):
+        self.batches: List[List[int]] = []
+        self.release = asyncio.Event()
+
+    async def score_batch(self, inputs: List[InferenceInput]) -> List[int]:
+        self.batches.append([i.total for i in inputs])
+        await self.release.wait()
+        return [i.total * 2 for i in inputs]
+
+
+def test_queued_predictions_go_out_together():
+    async def main():
+        model = FakeModel()
+        batcher = MicroBatcher(model.score_batch, max_batch_size=8, max_wait=10)
+
+        calls = [asyncio.ensure_future(batcher.predict(_input(t))) for t in range(1, 6)]
+        await _settle()
+        # Nothing was running, so the first prediction went out alone
+        assert model.batches == [[1]]
+        assert batcher.get_stats()["queued"] == 4
+
+        model.release.set()
+        assert await asyncio.gather(*calls) == [2, 4, 6, 8, 10]
+        assert model.batches == [[1], [2, 3, 4, 5]]
+        assert batcher.get_stats()["mean_batch_size"] == 2.5
+
+    asyncio.run(main())
+
+
+def test_full_batch_does_not_wait():
+    async def main():
+        model = FakeModel()
+        batcher = MicroBatcher(model.score_batch, max_batch_size=2, max_wait=10)
+
+        calls = [asyncio.ensure_future(batcher.predict(_input(t))) for t in range(1, 6)]
+        await _settle()
+        assert model.batches == [[1], [2, 3], [4, 5]]
+
+        model.release.set()
+        assert await asyncio.gather(*calls) == [2, 4, 6, 8, 10]
+
+    asyncio.run(main())
+
+
+def test_window_flushes_while_a_batch_is_running():
+    async def main():
+        model = FakeModel()
+        batcher = MicroBatcher(model.score_batch, max_batch_size=8, max_wait=0.01)
+
+        calls = [asyncio.ensure_future(batcher.predict(_input(t))) for t in range(1, 4)]
+        await asyncio.sleep(0.05)
+        assert model.batches == [[1], [2, 3]]
+        assert batcher.get_stats()["in_flight"] == 2
+
+        model.release.set()
+        assert await asyncio.gather(*calls) == [2, 4, 6]
+
+    asyncio.run(main())
+
+
+def test_failed_batch_fails_only_its_callers():
+    async def main():
+        failures = 0
+
+        async def score_batch(inputs):
+            nonlocal failures
+            await asyncio.sleep(0)
+            if any(i.total == 2 for i in inputs):
+                failures += 1
+                raise RuntimeError("model failed")
+            return [i.total for i in inputs]
+
+        batcher = MicroBatcher(score_batch, max_batch_size=2, max_wait=10)
+        outcomes = await asyncio.gather(
+            *(batcher.predict(_input(t)) for t in range(1, 6)), return_exceptions=True
+        )
+
+        assert outcomes[0] == 1
+        assert isinstance(outcomes[1], RuntimeError)
+        assert isinstance(outcomes[2], RuntimeError)
+        assert outcomes[3:] == [4, 5]
+        assert failures == 1
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("in_flight", [1, 2])
+def test_service_batches_match_single_predictions(make_service, in_flight):
+    inputs = [
+        InferenceInput(isapre=isapre, tipo=tipo, total=1_000 * (i + 1))
+        for i, (isapre, tipo) in enumerate(zip(IsapreEnum, TipoEnum))
+    ]
+
+    async def main():
+        expected = await make_service().predict_batch(inputs)
+
+        service = make_service(
+            micro_batch_size=4, micro_batch_wait=0.01, micro_batch_in_flight=in_flight
+        )
+        responses = await asyncio.gather(
+            *(service.predict_all_models(i) for i in inputs)
+        )
+        assert responses == expected
+
+        (batcher,) = service._micro_batchers.values()
+        stats = batcher.get_stats()
+        assert stats["predictions"] == len(inputs)
+        assert stats["batches"] < len(inputs)
+
+    asyncio.run(main())
@@ -0,0 +1,175 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+from sklearn.pipeline import Pipeline
+
+from benchmarks.standins import StandInBayesianNetwork, StandInRowProba
+from inference.adapters import (
+    BayesianNetworkAdapter,
+    GMMAdapter,
+    LogisticRegressorAdapter,
+)
+from inference.models import (
+    ISAPRE_INDEX,
+    ISAPRE_VALUES,
+    TIPO_INDEX,
+    TIPO_VALUES,
+    CompiledBayesianNetwork,
+    GMMScorer,
+    LogisticScorer,
+)
+
+# Totals on and around the stand-in network's bin edges
+EDGE_TOTALS = [1, 19_999, 20_000, 20_001, 50_000, 50_001, 999_999, 1_000_000, 1_000_001]
+
+
+def _rows(claims: pd.DataFrame) -> pd.DataFrame:
+    """The random claims plus every (isapre, tipo) pair at every edge total."""
+    edges = pd.DataFrame(
+        list(itertools.product(ISAPRE_VALUES, TIPO_VALUES, EDGE_TOTALS)),
+        columns=["isapre", "tipo", "total"],
+    )
+    return pd.concat([claims, edges], ignore_index=True)
+
+
+def _arrays(rows: pd.DataFrame):
+    return (
+        rows["isapre"].map(ISAPRE_INDEX).to_numpy(),
+        rows["tipo"].map(TIPO_INDEX).to_numpy(),
+        rows["total"].to_numpy(dtype=np.float64),
+    )
+
+
+def _network_outputs(network, rows: pd.DataFrame) -> np.ndarray:
+    return np.array(
+        [
+            network.predict_all(isapre, tipo, int(total))
+            for isapre, tipo, total in rows.itertuples(index=False)
+        ],
+        dtype=np.float64,
+    )
+
+
+def _row_outputs(model, rows: pd.DataFrame) -> np.ndarray:
+    return np.array(
+        [
+            model(
+                pd.Series(
+                    {
+                        "isapre": isapre,
+                        "tipo": tipo,
+                        "total": int(total),
+                        "total_log": np.log1p(total),
+                    }
+                )
+            )
+            for isapre, tipo, total in rows.itertuples(index=False)
+        ]
+    )
+
+
+class SkewedPipeline(Pipeline):
+    """A pipeline whose probabilities aren't a logistic function of its inputs."""
+
+    def predict_proba(self, X):
+        probabilities = super().predict_proba(X)
+        return probabilities**2 / (probabilities**2).sum(axis=1, keepdims=True)
+
+
+class SkewedBayesianNetwork(StandInBayesianNetwork):
+    """A network whose answers also depend on the total inside each bin."""
+
+    def predict_all(self, isapre, tipo, total):
+        probability, amount, days = super().predict_all(isapre, tipo, total)
+        return probability, amount + total % 2, days
+
+
+class SkewedRowProba(StandInRowProba):
+    """A row callable that isn't a ratio of the two mixtures."""
+
+    def __call__(self, row):
+        return super().__call__(row) ** 2
+
+
+def test_logistic_scorer_matches_pipeline(logistic_regressor, claims):
+    scorer = LogisticScorer.from_pipeline(logistic_regressor)
+    assert scorer is not None
+
+    rows = _rows(claims)
+    probabilities, predicted_classes = scorer.score(*_arrays(rows))
+    np.testing.assert_allclose(
+        probabilities,
+        logistic_regressor.predict_proba(rows)[:, 1],
+        rtol=1e-9,
+        atol=1e-12,
+    )
+    np.testing.assert_array_equal(predicted_classes, logistic_regressor.predict(rows))
+
+
+def test_logistic_adapter_falls_back_to_pipeline(logistic_regressor, claims):
+    pipeline = SkewedPipeline(logistic_regressor.steps)
+    adapter = LogisticRegressorAdapter(pipeline)
+    assert adapter.scorer is None
+
+    rows = _rows(claims)
+    columns = adapter.score_arrays(*_arrays(rows))
+    np.testing.assert_array_equal(
+        columns["probability"], pipeline.predict_proba(rows)[:, 1]
+    )
+
+
+def test_compiled_network_matches_predict_all(bayesian_network, claims):
+    tables = CompiledBayesianNetwork.compile(bayesian_network)
+    assert tables is not None
+    assert tables.covers_all_totals()
+
+    rows = _rows(claims)
+    probabilities, amounts, days, found = tables.lookup(*_arrays(rows))
+    assert found.all()
+    np.testing.assert_array_equal(
+        np.column_stack([probabilities, amounts, days]),
+        _network_outputs(bayesian_network, rows),
+    )
+
+
+def test_network_adapter_falls_back_to_predict_all(claims):
+    network = SkewedBayesianNetwork()
+    adapter = BayesianNetworkAdapter(network)
+    assert adapter.tables is None
+
+    rows = _rows(claims)
+    columns = adapter.score_arrays(*_arrays(rows))
+    np.testing.assert_array_equal(
+        np.column_stack(
+            [
+                columns["probability"],
+                columns["expected_amount"],
+                columns["expected_days"],
+            ]
+        ),
+        _network_outputs(network, rows),
+    )
+
+
+def test_gmm_scorer_matches_callable(row_proba, claims):
+    scorer = GMMScorer.from_callable(row_proba)
+    assert scorer is not None
+
+    rows = _rows(claims)
+    np.testing.assert_allclose(
+        scorer.score(*_arrays(rows)),
+        _row_outputs(row_proba, rows),
+        rtol=1e-7,
+        atol=1e-9,
+    )
+
+
+def test_gmm_adapter_falls_back_to_callable(claims):
+    model = SkewedRowProba()
+    adapter = GMMAdapter(model)
+    assert adapter.scorer is None
+
+    rows = _rows(claims)
+    columns = adapter.score_arrays(*_arrays(rows))
+    np.testing.assert_array_equal(columns["probability"], _row_outputs(model, rows))
@@ -0,0 +1,83 @@
+import asyncio
+import copy
+
+import pytest
+
+from inference.schemas import MODEL_SECTIONS, InferenceInput, IsapreEnum, TipoEnum
+
+INPUT = InferenceInput(isapre=IsapreEnum.FONASA, tipo=TipoEnum.DENTAL, total=50_000)
+
+
+@pytest.fixture
+def slow_gmm_service(make_service, adapters):
+    """A service whose GMM takes far longer than any deadline in these tests."""
+    slow = copy.copy(adapters["gmm"])
+
+    async def predict_batch(inputs):
+        await asyncio.sleep(10)
+        return slow.score_batch(inputs)
+
+    slow.predict_batch = predict_batch
+    service = make_service(prediction_cache_size=10)
+    service._adapters["gmm"] = slow
+    return service
+
+
+def test_slow_model_is_left_out(slow_gmm_service, make_service):
+    async def main():
+        expected = await make_service().predict_all_models(INPUT)
+
+        response, etag = await slow_gmm_service.predict_models_tagged(
+            INPUT, MODEL_SECTIONS, timeout=0.1
+        )
+        assert response.timed_out == ["gmm"]
+        assert response.gmm is None
+        assert response.logistic_regression == expected.logistic_regression
+        assert response.bayesian_network == expected.bayesian_network
+        # Partial responses are neither tagged nor cached
+        assert etag is None
+        assert slow_gmm_service.get_cache_stats()["predictions"]["size"] == 0
+
+    asyncio.run(main())
+
+
+def test_models_within_deadline_answer_in_full(make_service):
+    async def main():
+        service = make_service(prediction_cache_size=10)
+        response, etag = await service.predict_models_tagged(
+            INPUT, MODEL_SECTIONS, timeout=10
+        )
+        assert response.timed_out is None
+        assert all(getattr(response, section) is not None for section in MODEL_SECTIONS)
+        assert etag == service.prediction_etag(INPUT)
+
+        # A full response is cached and served again without a deadline
+        assert await service.predict_all_models(INPUT) == response
+
+    asyncio.run(main())
+
+
+def test_only_requested_sections_get_deadlines(slow_gmm_service):
+    async def main():
+        response = await slow_gmm_service.predict_models(
+            INPUT, ["logistic_regression"], timeout=0.1
+        )
+        assert response.timed_out is None
+        assert response.logistic_regression is not None
+        assert response.bayesian_network is None and response.gmm is None
+
+    asyncio.run(main())
+
+
+def test_model_errors_are_not_timeouts(make_service, adapters):
+    failing = copy.copy(adapters["discrete_bayesian_network"])
+
+    async def predict_batch(inputs):
+        raise RuntimeError("model failed")
+
+    failing.predict_batch = predict_batch
+    service = make_service()
+    service._adapters["discrete_bayesian_network"] = failing
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        asyncio.run(service.predict_models(INPUT, MODEL_SECTIONS, timeout=1))
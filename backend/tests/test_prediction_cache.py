@@ -0,0 +1,82 @@
+import pytest
+
+from inference import prediction_cache
+from inference.prediction_cache import PredictionCache
+from inference.schemas import GMMResponse, PredictionResponse
+
+
+class Clock:
+    """Stand-in for ``time.monotonic`` that only moves when told to."""
+
+    def __init__(self):
+        self.now = 1_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(prediction_cache.time, "monotonic", clock)
+    return clock
+
+
+def _response(probability: float) -> PredictionResponse:
+    return PredictionResponse(gmm=GMMResponse(probability=probability))
+
+
+def test_evicts_least_recently_used(clock):
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put("a", _response(0.1))
+    cache.put("b", _response(0.2))
+
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == _response(0.1)
+    cache.put("c", _response(0.3))
+
+    assert cache.get("b") is None
+    assert cache.get("a") == _response(0.1)
+    assert cache.get("c") == _response(0.3)
+    assert cache.get_stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1}
+
+
+def test_put_refreshes_an_existing_entry(clock):
+    cache = PredictionCache(max_size=2, ttl_seconds=60)
+    cache.put("a", _response(0.1))
+    cache.put("b", _response(0.2))
+    cache.put("a", _response(0.4))
+    cache.put("c", _response(0.3))
+
+    assert cache.get("a") == _response(0.4)
+    assert cache.get("b") is None
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    cache.put("a", _response(0.1))
+
+    clock.now += 60
+    assert cache.get("a") == _response(0.1)
+
+    clock.now += 0.001
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
+
+
+@pytest.mark.parametrize("ttl_seconds", [0, -1])
+def test_non_positive_ttl_never_expires(clock, ttl_seconds):
+    cache = PredictionCache(max_size=10, ttl_seconds=ttl_seconds)
+    cache.put("a", _response(0.1))
+
+    clock.now += 365 * 24 * 3600
+    assert cache.get("a") == _response(0.1)
+
+
+def test_size_zero_disables_cache(clock):
+    cache = PredictionCache(max_size=0, ttl_seconds=60)
+    assert not cache.enabled
+
+    cache.put("a", _response(0.1))
+    assert cache.get("a") is None
+    assert cache.get_stats()["size"] == 0
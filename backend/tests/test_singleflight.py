@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from inference.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_call():
+    async def main():
+        flight = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return object()
+
+        waiters = [asyncio.ensure_future(flight.do("gmm", load)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flight.in_flight() == 1
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert (flight.started, flight.coalesced) == (1, 4)
+        assert flight.in_flight() == 0
+
+    asyncio.run(main())
+
+
+def test_different_keys_run_separately():
+    async def main():
+        flight = SingleFlight()
+
+        async def load(name):
+            await asyncio.sleep(0)
+            return name
+
+        results = await asyncio.gather(
+            flight.do("gmm", lambda: load("gmm")),
+            flight.do("logistic_regressor", lambda: load("logistic_regressor")),
+        )
+        assert results == ["gmm", "logistic_regressor"]
+        assert (flight.started, flight.coalesced) == (2, 0)
+
+    asyncio.run(main())
+
+
+def test_failure_is_shared_then_forgotten():
+    async def main():
+        flight = SingleFlight()
+        attempts = 0
+
+        async def load():
+            nonlocal attempts
+            attempts += 1
+            await asyncio.sleep(0)
+            if attempts == 1:
+                raise RuntimeError("download failed")
+            return "model"
+
+        outcomes = await asyncio.gather(
+            *(flight.do("gmm", load) for _ in range(3)), return_exceptions=True
+        )
+        assert attempts == 1
+        assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+
+        # The failure isn't remembered: the next caller starts a fresh call
+        assert await flight.do("gmm", load) == "model"
+        assert attempts == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def load():
+            await release.wait()
+            return "model"
+
+        first = asyncio.ensure_future(flight.do("gmm", load))
+        second = asyncio.ensure_future(flight.do("gmm", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await second == "model"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(main())
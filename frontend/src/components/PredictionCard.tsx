@@ -1,10 +1,11 @@
 import { useEffect, useState } from 'react';
-import { Brain, TrendingUp, BarChart3, CheckCircle, XCircle } from 'lucide-react';
+import { Brain, TrendingUp, BarChart3, CheckCircle, XCircle, Clock } from 'lucide-react';
 import { cn } from '@/lib/utils';
 import type { 
   LogisticRegressionResponse, 
   BayesianNetworkResponse, 
-  GMMResponse 
+  GMMResponse,
+  ModelSection
 } from '../types/api';
 
 interface AnimatedNumberProps {
@@ -280,4 +281,38 @@ export function GMMCard({ data, isVisible }: GMMCardProps) {
       </div>
     </div>
   );
-} 
\ No newline at end of file
+} 
+const MODEL_TITLES: Record<ModelSection, string> = {
+  logistic_regression: 'Regresión Logística',
+  bayesian_network: 'Red Bayesiana',
+  gmm: 'Modelo Gaussiano',
+};
+
+interface TimedOutCardProps {
+  model: ModelSection;
+  isVisible: boolean;
+}
+
+export function TimedOutCard({ model, isVisible }: TimedOutCardProps) {
+  return (
+    <div className={cn(
+      'rounded-xl border border-slate-600/50 bg-gradient-to-br from-slate-800/50 to-slate-900/50',
+      'backdrop-blur-sm p-6 transition-all duration-700',
+      isVisible ? 'opacity-100 translate-y-0' : 'opacity-0 translate-y-8'
+    )}>
+      <div className="flex items-center gap-3 mb-4">
+        <div className="p-2 rounded-lg bg-slate-500/20 text-slate-400">
+          <Clock className="w-6 h-6" />
+        </div>
+        <div>
+          <h3 className="text-lg font-semibold text-cyan-100">{MODEL_TITLES[model]}</h3>
+          <p className="text-sm text-slate-400">Sin respuesta a tiempo</p>
+        </div>
+      </div>
+
+      <p className="text-sm text-slate-400">
+        El modelo no respondió dentro del plazo y se omitió de esta predicción.
+      </p>
+    </div>
+  );
+}
@@ -1,4 +1,11 @@
-import type { PredictionRequest, PredictionResponse } from '../types/api';
+import type {
+  CurveRequest,
+  CurveResponse,
+  MatrixResponse,
+  PredictOptions,
+  PredictionRequest,
+  PredictionResponse,
+} from '../types/api';
 
 const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000';
 
@@ -20,14 +27,74 @@ export class PredictionApi {
     this.baseUrl = baseUrl;
   }
 
-  async predict(data: PredictionRequest): Promise<PredictionResponse> {
-    const response = await fetch(`${this.baseUrl}/predict`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json',
-      },
-      body: JSON.stringify(data),
+  async predict(
+    data: PredictionRequest,
+    options: PredictOptions = {}
+  ): Promise<PredictionResponse> {
+    const params = new URLSearchParams();
+    if (options.models) {
+      params.set('models', options.models.join(','));
+    }
+    if (options.timeoutMs) {
+      params.set('timeout_ms', String(options.timeoutMs));
+    }
+    let response: Response;
+    if (params.toString()) {
+      response = await fetch(`${this.baseUrl}/predict?${params}`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify(data),
+      });
+    } else {
+      // Full predictions go through the cacheable GET, so the browser and the
+      // CDN can answer repeated lookups
+      const query = new URLSearchParams({
+        isapre: data.isapre,
+        tipo: data.tipo,
+        total: String(data.total),
+      });
+      response = await fetch(`${this.baseUrl}/predict?${query}`);
+    }
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new ApiError(
+        errorData.detail || `HTTP error! status: ${response.status}`,
+        response.status,
+        response
+      );
+    }
+
+    return response.json();
+  }
+
+  async predictCurve(data: CurveRequest): Promise<CurveResponse> {
+    const params = new URLSearchParams({
+      isapre: data.isapre,
+      tipo: data.tipo,
+      min: String(data.min),
+      max: String(data.max),
+      points: String(data.points),
     });
+    const response = await fetch(`${this.baseUrl}/predict/curve?${params}`);
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new ApiError(
+        errorData.detail || `HTTP error! status: ${response.status}`,
+        response.status,
+        response
+      );
+    }
+
+    return response.json();
+  }
+
+  async predictMatrix(total: number): Promise<MatrixResponse> {
+    const params = new URLSearchParams({ total: String(total) });
+    const response = await fetch(`${this.baseUrl}/predict/matrix?${params}`);
 
     if (!response.ok) {
       const errorData = await response.json().catch(() => ({}));
@@ -5,7 +5,8 @@ import { PredictionForm } from '../components/PredictionForm';
 import { 
   LogisticRegressionCard, 
   BayesianNetworkCard, 
-  GMMCard 
+  GMMCard,
+  TimedOutCard
 } from '../components/PredictionCard';
 import { Button } from '../components/ui/Button';
 import type { PredictionResponse } from '../types/api';
@@ -109,18 +110,27 @@ function App() {
             </div>
 
             <div className="grid grid-cols-1 lg:grid-cols-2 xl:grid-cols-3 gap-8 mb-8">
-              <LogisticRegressionCard 
-                data={prediction.logistic_regression} 
-                isVisible={showResults}
-              />
-              <BayesianNetworkCard 
-                data={prediction.bayesian_network} 
-                isVisible={showResults}
-              />
-              <GMMCard 
-                data={prediction.gmm} 
-                isVisible={showResults}
-              />
+              {prediction.logistic_regression && (
+                <LogisticRegressionCard 
+                  data={prediction.logistic_regression} 
+                  isVisible={showResults}
+                />
+              )}
+              {prediction.bayesian_network && (
+                <BayesianNetworkCard 
+                  data={prediction.bayesian_network} 
+                  isVisible={showResults}
+                />
+              )}
+              {prediction.gmm && (
+                <GMMCard 
+                  data={prediction.gmm} 
+                  isVisible={showResults}
+                />
+              )}
+              {prediction.timed_out?.map((model) => (
+                <TimedOutCard key={model} model={model} isVisible={showResults} />
+              ))}
             </div>
 
             {/* Reset button */}
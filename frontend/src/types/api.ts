@@ -51,10 +51,64 @@ export interface GMMResponse {
   probability: number;
 }
 
+export type ModelSection = 'logistic_regression' | 'bayesian_network' | 'gmm';
+
+// Sections are missing for models that weren't requested or missed their
+// deadline; the latter are listed in timed_out
 export interface PredictionResponse {
-  logistic_regression: LogisticRegressionResponse;
-  bayesian_network: BayesianNetworkResponse;
-  gmm: GMMResponse;
+  logistic_regression?: LogisticRegressionResponse;
+  bayesian_network?: BayesianNetworkResponse;
+  gmm?: GMMResponse;
+  timed_out?: ModelSection[];
+}
+
+export interface PredictOptions {
+  models?: ModelSection[];
+  timeoutMs?: number;
+}
+
+export interface CurveRequest {
+  isapre: IsapreOption;
+  tipo: TipoOption;
+  min: number;
+  max: number;
+  points: number;
+}
+
+export interface CurveResponse {
+  isapre: IsapreOption;
+  tipo: TipoOption;
+  total: number[];
+  logistic_regression: {
+    probability: number[];
+    chosen_class: boolean[];
+  };
+  bayesian_network: {
+    probability: number[];
+    expected_reimbursement: number[];
+    expected_wait: number[];
+  };
+  gmm: {
+    probability: number[];
+  };
+}
+
+export interface MatrixResponse {
+  total: number;
+  isapre: IsapreOption[];
+  tipo: TipoOption[];
+  logistic_regression: {
+    probability: number[][];
+    chosen_class: boolean[][];
+  };
+  bayesian_network: {
+    probability: number[][];
+    expected_reimbursement: number[][];
+    expected_wait: number[][];
+  };
+  gmm: {
+    probability: number[][];
+  };
 }
 
 // UI State types